@@ -16,12 +16,11 @@ Environment Variables:
 
 import os
 import sys
-import json
-import time
-import requests
 import argparse
 from datetime import datetime
 
+from rate_limit import SlidingWindowLimiter, graphql_post, make_session
+
 # Configuration
 SHOPIFY_STORE = os.environ.get('SHOPIFY_STORE', 'kingsway-janitorial.myshopify.com')
 SHOPIFY_ACCESS_TOKEN = os.environ.get('SHOPIFY_ACCESS_TOKEN', '')
@@ -32,41 +31,22 @@ HEADERS = {
     'X-Shopify-Access-Token': SHOPIFY_ACCESS_TOKEN
 }
 
-RATE_LIMIT_DELAY = 0.5
+REQUESTS_PER_SECOND = 2
+METAFIELDS_PER_CALL = 25  # metafieldsSet input limit
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 3
 
+SESSION = make_session(HEADERS)
+LIMITER = SlidingWindowLimiter(REQUESTS_PER_SECOND)
+
 
 def log(msg, level='INFO'):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] [{level}] {msg}", flush=True)
 
 
 def graphql(query, variables=None):
-    payload = {'query': query}
-    if variables:
-        payload['variables'] = variables
-
-    for attempt in range(MAX_RETRIES):
-        try:
-            resp = requests.post(GRAPHQL_URL, json=payload, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-            if resp.status_code in (429, 503):
-                wait = min(int(resp.headers.get('Retry-After', (attempt + 1) * 10)), 60)
-                log(f"HTTP {resp.status_code}, retry in {wait}s...", 'WARNING')
-                time.sleep(wait)
-                continue
-            resp.raise_for_status()
-            result = resp.json()
-            if 'errors' in result:
-                log(f"GraphQL errors: {result['errors']}", 'WARNING')
-            return result
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-            if attempt < MAX_RETRIES - 1:
-                wait = (attempt + 1) * 10
-                log(f"Connection error, retry {attempt+1}/{MAX_RETRIES} in {wait}s...", 'WARNING')
-                time.sleep(wait)
-            else:
-                raise
-    return {}
+    return graphql_post(SESSION, GRAPHQL_URL, query, variables, limiter=LIMITER,
+                        max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT)
 
 
 def fetch_all_products():
@@ -125,14 +105,18 @@ def fetch_all_products():
         if len(products) % 1000 == 0:
             log(f"  Fetched {len(products)} products...")
 
-        time.sleep(RATE_LIMIT_DELAY)
 
     log(f"✓ Fetched {len(products)} total products")
     return products
 
 
-def set_mpn_metafield(product_id, sku):
-    """Set the custom.mpn metafield on a single product."""
+def set_mpn_metafields(batch):
+    """Set custom.mpn on up to METAFIELDS_PER_CALL products in one call.
+
+    metafieldsSet is atomic: one bad entry rejects the whole batch, so a
+    rejected batch is resent one product at a time to write the valid ones.
+    Returns the number actually written.
+    """
     mutation = """
     mutation metafieldsSet($metafields: [MetafieldsSetInput!]!) {
       metafieldsSet(metafields: $metafields) {
@@ -144,20 +128,28 @@ def set_mpn_metafield(product_id, sku):
 
     variables = {
         "metafields": [{
-            "ownerId": product_id,
+            "ownerId": p['id'],
             "namespace": "custom",
             "key": "mpn",
-            "value": sku,
+            "value": p['sku'],
             "type": "single_line_text_field"
-        }]
+        } for p in batch]
     }
 
     result = graphql(mutation, variables)
-    errors = result.get('data', {}).get('metafieldsSet', {}).get('userErrors', [])
+    payload = (result.get('data') or {}).get('metafieldsSet')
+    if payload is None:
+        # Top-level errors (THROTTLED, access denied...) — graphql() logged them
+        log(f"  No metafieldsSet result for {len(batch)} products starting {batch[0]['id']}", 'WARNING')
+        return 0
+    errors = payload.get('userErrors', [])
     if errors:
-        log(f"  Error on {product_id}: {errors}", 'WARNING')
-        return False
-    return bool(result.get('data', {}).get('metafieldsSet', {}).get('metafields'))
+        if len(batch) == 1:
+            log(f"  {batch[0]['id']} ({batch[0]['sku']}) rejected: {errors}", 'WARNING')
+            return 0
+        log(f"  Batch starting {batch[0]['id']} rejected ({errors}) — retrying one by one", 'WARNING')
+        return sum(set_mpn_metafields([p]) for p in batch)
+    return len(payload.get('metafields') or [])
 
 
 def main():
@@ -208,18 +200,18 @@ def main():
     updated = 0
     errors = 0
 
-    for i, p in enumerate(needs_backfill, 1):
+    for start in range(0, len(needs_backfill), METAFIELDS_PER_CALL):
+        batch = needs_backfill[start:start + METAFIELDS_PER_CALL]
         if dry_run:
-            updated += 1
+            updated += len(batch)
         else:
-            if set_mpn_metafield(p['id'], p['sku']):
-                updated += 1
-            else:
-                errors += 1
-            time.sleep(RATE_LIMIT_DELAY)
-
-        if i % 200 == 0 or i == len(needs_backfill):
-            log(f"  Progress: {i}/{len(needs_backfill)} ({updated} ok, {errors} errors)")
+            ok = set_mpn_metafields(batch)
+            updated += ok
+            errors += len(batch) - ok
+
+        done = start + len(batch)
+        if done % 200 == 0 or done == len(needs_backfill):
+            log(f"  Progress: {done}/{len(needs_backfill)} ({updated} ok, {errors} errors)")
 
     # Summary
     log(f"\n{'=' * 60}")
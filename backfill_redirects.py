@@ -31,11 +31,10 @@ Environment Variables:
 
 import os
 import sys
-import time
-import requests
 import argparse
 from datetime import datetime
 
+from rate_limit import SlidingWindowLimiter, graphql_post, make_session, run_concurrently
 from shopify_auth import get_access_token
 
 # Configuration
@@ -48,41 +47,21 @@ HEADERS = {
     'X-Shopify-Access-Token': SHOPIFY_ACCESS_TOKEN
 }
 
-RATE_LIMIT_DELAY = 0.5
+REQUESTS_PER_SECOND = 4  # urlRedirectCreate costs 10 points; restore is 50/s
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 3
 
+SESSION = make_session(HEADERS)
+LIMITER = SlidingWindowLimiter(REQUESTS_PER_SECOND)
+
 
 def log(msg, level='INFO'):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] [{level}] {msg}", flush=True)
 
 
 def graphql(query, variables=None):
-    payload = {'query': query}
-    if variables:
-        payload['variables'] = variables
-
-    for attempt in range(MAX_RETRIES):
-        try:
-            resp = requests.post(GRAPHQL_URL, json=payload, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-            if resp.status_code in (429, 503):
-                wait = min(int(resp.headers.get('Retry-After', (attempt + 1) * 10)), 60)
-                log(f"HTTP {resp.status_code}, retry in {wait}s...", 'WARNING')
-                time.sleep(wait)
-                continue
-            resp.raise_for_status()
-            result = resp.json()
-            if 'errors' in result:
-                log(f"GraphQL errors: {result['errors']}", 'WARNING')
-            return result
-        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-            if attempt < MAX_RETRIES - 1:
-                wait = (attempt + 1) * 10
-                log(f"Connection error, retry {attempt+1}/{MAX_RETRIES} in {wait}s...", 'WARNING')
-                time.sleep(wait)
-            else:
-                raise
-    return {}
+    return graphql_post(SESSION, GRAPHQL_URL, query, variables, limiter=LIMITER,
+                        max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT)
 
 
 def require_redirect_scope():
@@ -140,7 +119,6 @@ def fetch_collection_handles():
         if not page_info.get('hasNextPage'):
             break
         cursor = page_info['endCursor']
-        time.sleep(RATE_LIMIT_DELAY)
     log(f"✓ Found {len(handles)} collections")
     return handles
 
@@ -168,7 +146,6 @@ def fetch_existing_redirect_paths():
         if not page_info.get('hasNextPage'):
             break
         cursor = page_info['endCursor']
-        time.sleep(RATE_LIMIT_DELAY)
     log(f"✓ Found {len(paths)} existing redirects")
     return paths
 
@@ -201,7 +178,6 @@ def fetch_draft_products():
         cursor = page_info['endCursor']
         if len(products) % 1000 == 0:
             log(f"  Fetched {len(products)} draft products...")
-        time.sleep(RATE_LIMIT_DELAY)
     log(f"✓ Fetched {len(products)} draft products")
     return products
 
@@ -305,20 +281,15 @@ def main():
 
     created = 0
     errors = 0
-    for i, (path, target) in enumerate(to_create, 1):
-        if dry_run:
+    if dry_run:
+        for i, (path, target) in enumerate(to_create, 1):
             created += 1
             if i <= 20:
                 log(f"  [dry-run] {path} -> {target}")
-        else:
-            if create_url_redirect(path, target):
-                created += 1
-            else:
-                errors += 1
-            time.sleep(RATE_LIMIT_DELAY)
-
-        if i % 200 == 0 or i == len(to_create):
-            log(f"  Progress: {i}/{len(to_create)} ({created} ok, {errors} errors)")
+        log(f"  Progress: {len(to_create)}/{len(to_create)} ({created} ok, {errors} errors)")
+    else:
+        created = run_concurrently(lambda pair: create_url_redirect(*pair), to_create, progress_every=200)
+        errors = len(to_create) - created
 
     log(f"\n{'=' * 60}")
     log("COMPLETE")
@@ -16,11 +16,99 @@ v4.1 CHANGES:
 
 import re
 import json
+import math
 import csv
-from typing import Dict, List, Tuple, Optional
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional, Pattern
 from collections import Counter
 
 
+@lru_cache(maxsize=None)
+def _compile_keywords(keywords: Tuple[str, ...]) -> Tuple[Optional[Pattern], Tuple[Tuple[str, Pattern], ...]]:
+    """
+    Compile a keyword list once: a single alternation that answers "does ANY
+    keyword match?" in one regex scan, plus the per-keyword patterns (in list
+    order) used to report which keyword matched first.
+    """
+    patterns = []
+    for keyword in keywords:
+        if not keyword:
+            continue
+        normalized_keyword = keyword.lower().strip()
+        if ' ' in normalized_keyword:
+            # Exact phrase match
+            patterns.append((keyword, re.escape(normalized_keyword)))
+        else:
+            # Word boundary match
+            patterns.append((keyword, r'\b' + re.escape(normalized_keyword) + r'\b'))
+
+    if not patterns:
+        return None, ()
+    any_keyword = re.compile('|'.join(f'(?:{p})' for _, p in patterns))
+    return any_keyword, tuple((k, re.compile(p)) for k, p in patterns)
+
+
+# normalize_text() passes, compiled once (in order of application)
+_CAMEL_LOWER_UPPER = re.compile(r'([a-z])([A-Z])')
+_CAMEL_ACRONYM = re.compile(r'([A-Z]+)([A-Z][a-z])')
+_LETTER_DIGIT = re.compile(r'([a-zA-Z])(\d)')
+_DIGIT_LETTER = re.compile(r'(\d)([a-zA-Z])')
+_PUNCTUATION = re.compile(r'[^\wà-ÿ\s]')
+_WHITESPACE = re.compile(r'\s+')
+_SKU_NOISE = [
+    re.compile(r'\b[a-z]{1,10}[_-][a-z0-9\-_]{2,}\b'),
+    re.compile(r'\b[a-z]{0,4}\d{2,}\b'),
+    re.compile(r'\b\d{2,}[-_]\w+\b'),
+]
+
+
+@lru_cache(maxsize=65536)
+def _normalize_text(text: str) -> str:
+    """
+    Cached body of ProductCategorizer.normalize_text(). The same titles,
+    descriptions and SKUs come through many times per run (both languages,
+    the tier-3 fallback, repeated catalogue rows), so memoize the regex work.
+    """
+    if not text:
+        return ""
+    
+    # --- CamelCase splitting (BEFORE lowercasing) --- v4.1 CHANGE
+    # Split "BeltElite" → "Belt Elite"
+    t = _CAMEL_LOWER_UPPER.sub(r'\1 \2', text)
+    # Split "HTMLParser" → "HTML Parser" 
+    t = _CAMEL_ACRONYM.sub(r'\1 \2', t)
+    # Split letter-digit and digit-letter boundaries
+    # "Filter4300" → "Filter 4300", "4300Filter" → "4300 Filter"
+    t = _LETTER_DIGIT.sub(r'\1 \2', t)
+    t = _DIGIT_LETTER.sub(r'\1 \2', t)
+    
+    # Now lowercase
+    t = t.lower()
+    # Replace common punctuation with space
+    t = _PUNCTUATION.sub(' ', t)
+    # Collapse whitespace
+    t = _WHITESPACE.sub(' ', t).strip()
+    # Remove SKU/model noise patterns
+    for pattern in _SKU_NOISE:
+        t = pattern.sub(' ', t)
+    t = _WHITESPACE.sub(' ', t).strip()
+    return t
+
+
+def _match_compiled(normalized_text: str, compiled) -> Tuple[bool, Optional[str]]:
+    """Match normalized text against a _compile_keywords() result."""
+    any_keyword, patterns = compiled
+    # Most categories don't match at all — reject them with one scan
+    if any_keyword is None or not normalized_text or not any_keyword.search(normalized_text):
+        return False, None
+
+    for keyword, pattern in patterns:
+        if pattern.search(normalized_text):
+            return True, keyword
+
+    return False, None
+
+
 class ProductCategorizer:
     def __init__(self, category_rules_path: str):
         with open(category_rules_path, 'r', encoding='utf-8') as f:
@@ -31,6 +119,18 @@ class ProductCategorizer:
         self.global_part_keywords = settings.get('global_part_keywords', [])
         self.skip_patterns = settings.get('skip_patterns', {})
         
+        # Skip rules resolved once instead of per product: a set for the JV
+        # category check, lowercased title patterns (EN first, then FR)
+        self.skip_jv_categories = frozenset(self.skip_patterns.get('skip_jv_categories', []))
+        self.skip_title_patterns = [
+            (pattern.lower(), f"Matched skip pattern: '{pattern}'")
+            for pattern in self.skip_patterns.get('title_patterns_en', [])
+        ] + [
+            (pattern.lower(), f"Matched skip pattern (FR): '{pattern}'")
+            for pattern in self.skip_patterns.get('title_patterns_fr', [])
+        ]
+        self.max_price_threshold = self.skip_patterns.get('max_price_threshold', 0.05)
+        
         # Load JohnnyVac category mappings
         self.jv_mappings = self.rules.get('jv_category_mappings', {})
         
@@ -41,6 +141,19 @@ class ProductCategorizer:
             reverse=True
         )
         
+        # Tier-2 rules flattened once per language: the keyword categories in
+        # priority order with their exclusion/keyword matchers precompiled
+        self.keyword_rules = {
+            lang: [
+                (category,
+                 _compile_keywords(tuple(category.get(f'exclusions_{lang}', []))),
+                 _compile_keywords(tuple(category.get(f'keywords_{lang}', []))))
+                for category in self.categories
+                if category.get('priority', 0) > 10  # fallbacks are handled specially
+            ]
+            for lang in ('en', 'fr')
+        }
+        
         # Build quick lookup for category handles
         self.category_by_handle = {
             cat['handle']: cat for cat in self.categories
@@ -61,28 +174,21 @@ class ProductCategorizer:
         jv_category = (product.get('ProductCategory') or '').strip()
         
         # Check if JV category should be skipped entirely
-        skip_categories = self.skip_patterns.get('skip_jv_categories', [])
-        if jv_category in skip_categories:
+        if jv_category in self.skip_jv_categories:
             return True, f"JV Category '{jv_category}' is in skip list"
         
-        # Check price threshold
+        # Check price threshold (text, blanks and nan/inf are not checked)
         try:
             price = float(product.get('RegularPrice') or 0)
-            max_price = self.skip_patterns.get('max_price_threshold', 0.05)
-            if price <= max_price and price > 0:
-                return True, f"Price ${price:.2f} below threshold ${max_price}"
         except (ValueError, TypeError):
-            pass
+            price = 0.0
+        if math.isfinite(price) and 0 < price <= self.max_price_threshold:
+            return True, f"Price ${price:.2f} below threshold ${self.max_price_threshold}"
         
-        # Check English skip patterns
-        for pattern in self.skip_patterns.get('title_patterns_en', []):
-            if pattern.lower() in combined_title:
-                return True, f"Matched skip pattern: '{pattern}'"
-        
-        # Check French skip patterns
-        for pattern in self.skip_patterns.get('title_patterns_fr', []):
-            if pattern.lower() in combined_title:
-                return True, f"Matched skip pattern (FR): '{pattern}'"
+        # Check English, then French skip patterns
+        for pattern, reason in self.skip_title_patterns:
+            if pattern in combined_title:
+                return True, reason
         
         return False, None
 
@@ -98,31 +204,7 @@ class ProductCategorizer:
         Hoover/Electrolux/Ametek (e.g., "BeltElite" → "Belt Elite",
         "FilterSprint" → "Filter Sprint", "BracketWall" → "Bracket Wall")
         """
-        if not text:
-            return ""
-        
-        # --- CamelCase splitting (BEFORE lowercasing) --- v4.1 CHANGE
-        # Split "BeltElite" → "Belt Elite"
-        t = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
-        # Split "HTMLParser" → "HTML Parser" 
-        t = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1 \2', t)
-        # Split letter-digit and digit-letter boundaries
-        # "Filter4300" → "Filter 4300", "4300Filter" → "4300 Filter"
-        t = re.sub(r'([a-zA-Z])(\d)', r'\1 \2', t)
-        t = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', t)
-        
-        # Now lowercase
-        t = t.lower()
-        # Replace common punctuation with space
-        t = re.sub(r'[^\wà-ÿ\s]', ' ', t)
-        # Collapse whitespace
-        t = re.sub(r'\s+', ' ', t).strip()
-        # Remove SKU/model noise patterns
-        t = re.sub(r'\b[a-z]{1,10}[_-][a-z0-9\-_]{2,}\b', ' ', t)
-        t = re.sub(r'\b[a-z]{0,4}\d{2,}\b', ' ', t)
-        t = re.sub(r'\b\d{2,}[-_]\w+\b', ' ', t)
-        t = re.sub(r'\s+', ' ', t).strip()
-        return t
+        return _normalize_text(text)
 
     # =========================================================================
     # KEYWORD MATCHING HELPERS
@@ -132,25 +214,14 @@ class ProductCategorizer:
         """Check if any keyword matches in the text"""
         if not text or not keywords:
             return False, None
-        
-        normalized_text = self.normalize_text(text)
-        
-        for keyword in keywords:
-            if not keyword:
-                continue
-            normalized_keyword = keyword.lower().strip()
-            
-            if ' ' in normalized_keyword:
-                # Exact phrase match
-                if normalized_keyword in normalized_text:
-                    return True, keyword
-            else:
-                # Word boundary match
-                pattern = r'\b' + re.escape(normalized_keyword) + r'\b'
-                if re.search(pattern, normalized_text):
-                    return True, keyword
-        
-        return False, None
+        return self._match_normalized(self.normalize_text(text), keywords)
+
+    def _match_normalized(self, normalized_text: str, keywords: List[str]) -> Tuple[bool, Optional[str]]:
+        """match_keywords() for text that is already normalized"""
+        if not normalized_text or not keywords:
+            return False, None
+
+        return _match_compiled(normalized_text, _compile_keywords(tuple(keywords)))
 
     def has_exclusions(self, text: str, exclusions: List[str]) -> Tuple[bool, Optional[str]]:
         """Check if any exclusion keyword matches"""
@@ -217,28 +288,19 @@ class ProductCategorizer:
             )
         
         normalized_text = self.normalize_text(raw_text)
+        # match_keywords() normalizes its input; do that once here instead of
+        # twice per category
+        match_text = self.normalize_text(normalized_text)
         
         # Try each category in priority order
-        for category in self.categories:
-            # Skip fallback categories (we handle them specially)
-            if category.get('priority', 0) <= 10:
-                continue
-            
-            # Choose language-specific keywords/exclusions
-            if language == 'fr':
-                keywords = category.get('keywords_fr', [])
-                exclusions = category.get('exclusions_fr', [])
-            else:
-                keywords = category.get('keywords_en', [])
-                exclusions = category.get('exclusions_en', [])
-            
+        for category, exclusions, keywords in self.keyword_rules['fr' if language == 'fr' else 'en']:
             # Check exclusions first
-            has_excl, excl_keyword = self.has_exclusions(normalized_text, exclusions)
+            has_excl, excl_keyword = _match_compiled(match_text, exclusions)
             if has_excl:
                 continue  # Skip this category if exclusion found
             
             # Check for keyword match
-            matched, matched_keyword = self.match_keywords(normalized_text, keywords)
+            matched, matched_keyword = _match_compiled(match_text, keywords)
             if matched:
                 # Determine confidence based on where match was found
                 confidence = 'low'
@@ -357,7 +419,7 @@ class ProductCategorizer:
     def _enforce_min_products(self, categorized: List[Dict]) -> List[Dict]:
         """Demote categories with too few products to 'Needs Review'"""
         # Count products per category
-        counts = Counter([p['category']['product_type'] for p in categorized])
+        counts = Counter(p['category']['product_type'] for p in categorized)
         
         # Build min_products lookup
         min_map = {
@@ -365,17 +427,22 @@ class ProductCategorizer:
             for c in self.categories
         }
         
+        # Decide per category, not per product: usually nothing falls short
+        # and the demotion pass below is skipped entirely
+        short = {
+            pt: (n, min_map.get(pt, 1)) for pt, n in counts.items()
+            if pt != 'Other > Needs Review' and n < min_map.get(pt, 1)
+        }
+        if not short:
+            return categorized
+        
         demoted = 0
         for product in categorized:
             pt = product['category']['product_type']
-            if pt == 'Other > Needs Review':
-                continue
-            
-            required = min_map.get(pt, 1)
-            if counts.get(pt, 0) < required:
-                original_pt = pt
+            if pt in short:
+                count, required = short[pt]
                 product['category'] = self._needs_review(
-                    reason=f"Demoted: category '{original_pt}' has {counts.get(pt, 0)} products (min: {required})"
+                    reason=f"Demoted: category '{pt}' has {count} products (min: {required})"
                 )
                 demoted += 1
         
@@ -18,6 +18,8 @@ import sys
 import json
 import requests
 import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional
 from datetime import datetime
 
@@ -38,7 +40,21 @@ HEADERS = {
     "X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN
 }
 
-RATE_LIMIT_DELAY = 0.5
+# Pace off the GraphQL cost bucket instead of a fixed sleep per call: only
+# wait when the bucket can't cover another request of the same cost.
+THROTTLE_MAX_WAIT = 10  # seconds
+
+# One keep-alive session for every call (no TLS handshake per request).
+# A 429 is retried after its Retry-After before raise_for_status() sees it:
+# it means the request never ran, so resending even a mutation is safe, and
+# so is a failed connect. Read errors are not retried (read=0, other=0): the
+# mutation may already have run — collectionCreate isn't idempotent.
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount('https://', HTTPAdapter(max_retries=Retry(
+    total=5, read=0, other=0, backoff_factor=1, status_forcelist=[429], allowed_methods=None,
+    respect_retry_after_header=True, raise_on_status=False,
+)))
 
 
 def log(msg: str):
@@ -46,6 +62,20 @@ def log(msg: str):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
 
 
+def balance_rate_limit(payload: Dict):
+    """Sleep just long enough for the bucket to refill to the cost of the
+    request that produced `payload` (extensions.cost.throttleStatus)"""
+    cost = (payload.get('extensions') or {}).get('cost') or {}
+    status = cost.get('throttleStatus') or {}
+    available = status.get('currentlyAvailable')
+    restore_rate = status.get('restoreRate')
+    if available is None or not restore_rate:
+        return
+    needed = cost.get('requestedQueryCost') or 0
+    if available < needed:
+        time.sleep(min((needed - available) / restore_rate, THROTTLE_MAX_WAIT))
+
+
 def load_category_map() -> List[Dict]:
     """Load category taxonomy from category_map_v4.json"""
     try:
@@ -95,14 +125,14 @@ def get_product_counts_by_type() -> Dict[str, int]:
     
     while has_next:
         try:
-            response = requests.post(
+            response = SESSION.post(
                 GRAPHQL_URL,
-                headers=HEADERS,
                 json={"query": query, "variables": {"cursor": cursor}},
                 timeout=30
             )
             response.raise_for_status()
             data = response.json()
+            balance_rate_limit(data)
             
             # Check for GraphQL errors
             if 'errors' in data:
@@ -123,8 +153,6 @@ def get_product_counts_by_type() -> Dict[str, int]:
             has_next = page_info['hasNextPage']
             cursor = page_info['endCursor']
             
-            time.sleep(RATE_LIMIT_DELAY)
-            
         except Exception as e:
             log(f"❌ Error fetching products: {e}")
             break
@@ -154,14 +182,14 @@ def collection_exists_by_handle(handle: str) -> Optional[Dict]:
     '''
     
     try:
-        response = requests.post(
+        response = SESSION.post(
             GRAPHQL_URL,
-            headers=HEADERS,
             json={"query": query, "variables": {"handle": handle}},
             timeout=30
         )
         response.raise_for_status()
         data = response.json()
+        balance_rate_limit(data)
         
         if 'errors' in data:
             log(f"⚠️  Check collection errors: {data['errors']}")
@@ -240,14 +268,14 @@ def create_automated_collection(
     }
     
     try:
-        response = requests.post(
+        response = SESSION.post(
             GRAPHQL_URL,
-            headers=HEADERS,
             json={"query": mutation, "variables": variables},
             timeout=30
         )
         response.raise_for_status()
         payload = response.json()
+        balance_rate_limit(payload)
         
         # DEBUG: Print full response if there's an issue
         if 'errors' in payload:
@@ -279,6 +307,60 @@ def create_automated_collection(
         return None
 
 
+_publication_id_cache: Optional[str] = None
+
+
+def get_online_store_publication_id() -> Optional[str]:
+    """Look up the Online Store publication ID once per run (it is the same
+    for every collection we publish)"""
+    global _publication_id_cache
+    if _publication_id_cache:
+        return _publication_id_cache
+    
+    pub_query = '''
+    query {
+      publications(first: 10) {
+        edges {
+          node {
+            id
+            name
+          }
+        }
+      }
+    }
+    '''
+    
+    response = SESSION.post(
+        GRAPHQL_URL,
+        json={"query": pub_query},
+        timeout=30
+    )
+    response.raise_for_status()
+    data = response.json()
+    balance_rate_limit(data)
+    
+    if 'errors' in data:
+        log(f"  ⚠️  Error getting publications: {data['errors']}")
+        return None
+    
+    publications = data.get('data', {}).get('publications', {}).get('edges', [])
+    
+    # Find Online Store publication
+    for pub in publications:
+        name = pub['node'].get('name', '').lower()
+        if 'online store' in name or 'online_store' in name:
+            _publication_id_cache = pub['node']['id']
+            return _publication_id_cache
+    
+    # Just use the first publication if we can't find Online Store
+    if publications:
+        _publication_id_cache = publications[0]['node']['id']
+        return _publication_id_cache
+    
+    log(f"  ⚠️  No publications found")
+    return None
+
+
 def publish_collection(collection_gid: str) -> bool:
     """Publish collection to Online Store using publishablePublish mutation"""
     
@@ -298,52 +380,10 @@ def publish_collection(collection_gid: str) -> bool:
     }
     '''
     
-    # First, get the Online Store publication ID
-    pub_query = '''
-    query {
-      publications(first: 10) {
-        edges {
-          node {
-            id
-            name
-          }
-        }
-      }
-    }
-    '''
-    
     try:
-        # Get publications
-        response = requests.post(
-            GRAPHQL_URL,
-            headers=HEADERS,
-            json={"query": pub_query},
-            timeout=30
-        )
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'errors' in data:
-            log(f"  ⚠️  Error getting publications: {data['errors']}")
-            return False
-        
-        publications = data.get('data', {}).get('publications', {}).get('edges', [])
-        
-        # Find Online Store publication
-        online_store_pub = None
-        for pub in publications:
-            name = pub['node'].get('name', '').lower()
-            if 'online store' in name or 'online_store' in name:
-                online_store_pub = pub['node']['id']
-                break
-        
+        online_store_pub = get_online_store_publication_id()
         if not online_store_pub:
-            # Just use the first publication if we can't find Online Store
-            if publications:
-                online_store_pub = publications[0]['node']['id']
-            else:
-                log(f"  ⚠️  No publications found")
-                return False
+            return False
         
         # Publish the collection
         variables = {
@@ -351,14 +391,14 @@ def publish_collection(collection_gid: str) -> bool:
             "input": [{"publicationId": online_store_pub}]
         }
         
-        response = requests.post(
+        response = SESSION.post(
             GRAPHQL_URL,
-            headers=HEADERS,
             json={"query": mutation, "variables": variables},
             timeout=30
         )
         response.raise_for_status()
         result = response.json()
+        balance_rate_limit(result)
         
         if 'errors' in result:
             log(f"  ⚠️  Publish errors: {result['errors']}")
@@ -414,7 +454,6 @@ def create_collections(categories: List[Dict], product_counts: Dict[str, int]):
             count = existing.get('productsCount', 0)
             log(f"   ✅ Already exists ({count} products)")
             skipped_exists += 1
-            time.sleep(RATE_LIMIT_DELAY)
             continue
         
         # Create collection
@@ -435,9 +474,6 @@ def create_collections(categories: List[Dict], product_counts: Dict[str, int]):
         else:
             failed += 1
             log(f"   ❌ Failed")
-        
-        # Rate limiting
-        time.sleep(RATE_LIMIT_DELAY)
     
     # Summary
     log("")
@@ -481,14 +517,14 @@ def main():
     log("Testing API connection...")
     test_query = '{ shop { name } }'
     try:
-        response = requests.post(
+        response = SESSION.post(
             GRAPHQL_URL,
-            headers=HEADERS,
             json={"query": test_query},
             timeout=10
         )
         response.raise_for_status()
         result = response.json()
+        balance_rate_limit(result)
         
         if 'errors' in result:
             log(f"❌ API Error: {result['errors']}")
@@ -21,19 +21,20 @@ Usage:
     python description_generator.py --live --export results.csv
 """
 
-import os, re, csv, time, argparse, requests
+import os, re, csv, argparse
 from datetime import datetime
 
 from product_content import (
     ai_available, build_description, generate_descriptions_ai,
     get_template_key, strip_html,
 )
+from rate_limit import SlidingWindowLimiter, graphql_post, make_session, run_concurrently
 
 SHOPIFY_STORE = os.environ.get('SHOPIFY_STORE', 'kingsway-janitorial.myshopify.com')
 SHOPIFY_ACCESS_TOKEN = os.environ.get('SHOPIFY_ACCESS_TOKEN', '')
 API_VERSION = '2026-01'
 MIN_DESCRIPTION_LENGTH = 80
-RATE_LIMIT_DELAY = 0.75
+REQUESTS_PER_WINDOW, RATE_WINDOW = 4, 3.0  # ~1.3 calls/s, bursts of 4
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 5
 
@@ -51,40 +52,19 @@ class DescriptionGenerator:
         self.stats = {'total_fetched': 0, 'thin_descriptions': 0, 'generated': 0,
                       'ai_generated': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
         self.results = []
+        self.session = make_session(self.headers)
+        self.limiter = SlidingWindowLimiter(REQUESTS_PER_WINDOW, RATE_WINDOW)
 
     def _graphql(self, query, variables=None):
-        payload = {'query': query}
-        if variables:
-            payload['variables'] = variables
-        for attempt in range(MAX_RETRIES):
-            try:
-                resp = requests.post(self.graphql_url, json=payload, headers=self.headers, timeout=REQUEST_TIMEOUT)
-                if resp.status_code in (429, 503):
-                    wait = min(int(resp.headers.get('Retry-After', (attempt + 1) * 10)), 60)
-                    log(f"HTTP {resp.status_code}, retry {attempt+1}/{MAX_RETRIES} in {wait}s...", 'WARNING')
-                    if attempt < MAX_RETRIES - 1:
-                        time.sleep(wait)
-                        continue
-                resp.raise_for_status()
-                result = resp.json()
-                if 'errors' in result:
-                    log(f"GraphQL errors: {result['errors']}", 'WARNING')
-                return result
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-                if attempt < MAX_RETRIES - 1:
-                    wait = (attempt + 1) * 10
-                    log(f"Connection error, retry {attempt+1}/{MAX_RETRIES} in {wait}s...", 'WARNING')
-                    time.sleep(wait)
-                else:
-                    raise
-        return {}
+        return graphql_post(self.session, self.graphql_url, query, variables, limiter=self.limiter,
+                            max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT)
 
     def fetch_thin_products(self, min_desc_length=MIN_DESCRIPTION_LENGTH):
         log("Fetching products from Shopify...")
         query = """query ($cursor: String) { products(first: 250, after: $cursor) {
-            edges { node { id title descriptionHtml productType vendor handle status
-                variants(first: 1) { nodes { sku } } } cursor }
-            pageInfo { hasNextPage } } }"""
+            edges { node { id title descriptionHtml productType
+                variants(first: 1) { nodes { sku } } } }
+            pageInfo { hasNextPage endCursor } } }"""
         all_count, thin = 0, []
         cursor = None
         while True:
@@ -98,10 +78,9 @@ class DescriptionGenerator:
                     thin.append(node)
             if not pi.get('hasNextPage'):
                 break
-            cursor = edges[-1]['cursor']
+            cursor = pi['endCursor']
             if all_count % 1000 == 0:
                 log(f"  Fetched {all_count} products...")
-            time.sleep(RATE_LIMIT_DELAY)
         self.stats['total_fetched'] = all_count
         self.stats['thin_descriptions'] = len(thin)
         log(f"✓ {all_count} total, {len(thin)} with thin descriptions (< {min_desc_length} chars)")
@@ -145,7 +124,7 @@ class DescriptionGenerator:
             log(f"✓ AI generated {len(ai_descriptions)} descriptions ({len(items) - len(ai_descriptions)} will use templates)")
 
         log(f"\nWriting descriptions for {len(thin)} products...")
-        for i, prod in enumerate(thin, 1):
+        for prod in thin:
             pid = prod['id']
             title = prod.get('title', '')
             pt = prod.get('productType', '')
@@ -162,25 +141,23 @@ class DescriptionGenerator:
             r = {'product_id': pid, 'sku': sku, 'title': title, 'product_type': pt,
                  'template_key': tk, 'engine': 'ai' if ai_desc else 'template',
                  'old_length': len(old_text), 'new_length': len(new_text),
-                 'new_description': new_html, 'new_description_text': new_text, 'status': 'pending'}
-
-            if not dry_run:
-                try:
-                    if self.update_product_description(pid, new_html):
-                        r['status'] = 'updated'; self.stats['updated'] += 1
-                    else:
-                        r['status'] = 'error'; self.stats['errors'] += 1
-                except Exception as e:
-                    log(f"Error updating {sku}: {e}", 'WARNING')
-                    r['status'] = 'error'; self.stats['errors'] += 1
-                time.sleep(RATE_LIMIT_DELAY)
-            else:
-                r['status'] = 'dry_run'
+                 'new_description': new_html, 'new_description_text': new_text,
+                 'status': 'dry_run' if dry_run else 'pending'}
 
             self.stats['generated'] += 1
             self.results.append(r)
-            if i % 100 == 0 or i == len(thin):
-                log(f"  Progress: {i}/{len(thin)}")
+        if dry_run:
+            log(f"  Progress: {len(thin)}/{len(thin)}")
+            return self.results
+
+        def record(r, ok):
+            if ok:
+                r['status'] = 'updated'; self.stats['updated'] += 1
+            else:
+                r['status'] = 'error'; self.stats['errors'] += 1
+
+        run_concurrently(lambda r: self.update_product_description(r['product_id'], r['new_description']),
+                         self.results, on_result=record)
         return self.results
 
     def export_results(self, filename='description_results.csv'):
@@ -20,6 +20,7 @@ import re
 import json
 import html as html_lib
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Optional
 
 
@@ -43,19 +44,25 @@ BRANDS = [
 
 DEFAULT_VENDOR = "JohnnyVac"
 
+# (lowercased needle, vendor name) in BRANDS order, built once — the first
+# listed brand found in the title wins
+_BRAND_NEEDLES = [
+    (brand.lower(), 'JohnnyVac' if 'johnny' in brand.lower() else brand)
+    for brand in BRANDS if brand.lower() != 'perfect'
+]
+_PERFECT_BRAND = re.compile(r'\bperfect\s+(vacuum|canister|upright|c\d+|pb\d+)', re.I)
+
 
 def extract_brand(title: str) -> Optional[str]:
     """Extract the real brand from a product title. Returns None if unknown."""
     text = (title or '').lower()
     # "Perfect" is only a brand in specific contexts ("perfect for..." is not)
     if 'perfect' in text:
-        if re.search(r'\bperfect\s+(vacuum|canister|upright|c\d+|pb\d+)', text, re.I):
+        if _PERFECT_BRAND.search(text):
             return "Perfect"
-    for brand in BRANDS:
-        if brand.lower() == 'perfect':
-            continue
-        if brand.lower() in text:
-            return 'JohnnyVac' if 'johnny' in brand.lower() else brand
+    for needle, brand in _BRAND_NEEDLES:
+        if needle in text:
+            return brand
     return None
 
 
@@ -68,10 +75,16 @@ def compute_vendor(title: str) -> str:
 # ATTRIBUTE EXTRACTION
 # =============================================================================
 
+_PACK_QUANTITY_PATTERNS = [re.compile(p) for p in (
+    r'pack\s+of\s+(\d+)', r'(\d+)\s*-?\s*pack', r'box\s+of\s+(\d+)',
+    r'(\d+)\s+bags', r'pk\s*(\d+)', r'(\d+)\s*pc',
+)]
+
+
 def extract_pack_quantity(title: str) -> Optional[int]:
-    for p in [r'pack\s+of\s+(\d+)', r'(\d+)\s*-?\s*pack', r'box\s+of\s+(\d+)',
-              r'(\d+)\s+bags', r'pk\s*(\d+)', r'(\d+)\s*pc']:
-        m = re.search(p, (title or '').lower())
+    t = (title or '').lower()
+    for p in _PACK_QUANTITY_PATTERNS:
+        m = p.search(t)
         if m:
             qty = int(m.group(1))
             if 1 < qty < 500:
@@ -902,6 +915,24 @@ PRODUCT_PATTERNS = {
     ]
 }
 
+# Compiled once at import; detect_seo_product_type() runs for every product
+# (twice — SEO title and SEO description)
+_SEO_PATTERNS = {
+    category: [re.compile(p, re.IGNORECASE) for p in patterns]
+    for category, patterns in PRODUCT_PATTERNS.items()
+}
+_SEO_HOSE = re.compile(r"\bhose[s]?\b", re.IGNORECASE)
+_SEO_CENTRAL_VAC_BAGS = [
+    re.compile(r"\bbags?\s+(for\s+)?central\s+vacuum", re.IGNORECASE),
+    re.compile(r"\bbags?\s+for\s+.*\bcentral\b", re.IGNORECASE),
+]
+_SEO_MACHINE_DEFINITIVE = [re.compile(p, re.IGNORECASE) for p in (
+    r"\bcentral\s+vacuum\b", r"\bvacuum\s+cleaner\b", r"\bcommercial\s+vacuum\b",
+    r"\bwet.*dry\b", r"\bextractor\b(?!\s*bag)",
+    r"\bscrubber\b", r"\bsweeper\b", r"\bpolisher\b", r"\bburnisher\b"
+)]
+_SEO_SCORED_CATEGORIES = [c for c in PRODUCT_TYPE_PRIORITY if c not in ("machines", "hoses")]
+
 CATEGORY_SEO = {
     "bags": {"suffix": "Vacuum Bags", "descriptors": ["replacement bags", "commercial grade", "quality filtration"]},
     "filters": {"suffix": "Filter Replacement", "descriptors": ["replacement filter", "commercial grade", "premium filtration"]},
@@ -930,39 +961,26 @@ def truncate_text(text, max_length, use_ellipsis=False):
     return truncated
 
 
+@lru_cache(maxsize=8192)
 def detect_seo_product_type(title: str, description: str = "") -> str:
     text = f"{title or ''} {description or ''}".lower()
 
-    if re.search(r"\bhose[s]?\b", text, re.IGNORECASE):
+    if _SEO_HOSE.search(text):
         return "hoses"
-    if re.search(r"\bbags?\s+(for\s+)?central\s+vacuum", text, re.IGNORECASE):
-        return "bags"
-    if re.search(r"\bbags?\s+for\s+.*\bcentral\b", text, re.IGNORECASE):
+    if any(p.search(text) for p in _SEO_CENTRAL_VAC_BAGS):
         return "bags"
 
-    machine_definitive = [
-        r"\bcentral\s+vacuum\b", r"\bvacuum\s+cleaner\b", r"\bcommercial\s+vacuum\b",
-        r"\bwet.*dry\b", r"\bextractor\b(?!\s*bag)",
-        r"\bscrubber\b", r"\bsweeper\b", r"\bpolisher\b", r"\bburnisher\b"
-    ]
-    for pattern in machine_definitive:
-        if re.search(pattern, text, re.IGNORECASE):
-            return "machines"
+    if any(p.search(text) for p in _SEO_MACHINE_DEFINITIVE):
+        return "machines"
 
-    for category in PRODUCT_TYPE_PRIORITY:
-        if category in ("machines", "hoses"):
-            continue
-        patterns = PRODUCT_PATTERNS.get(category, [])
-        matches = sum(1 for p in patterns if re.search(p, text, re.IGNORECASE))
+    for category in _SEO_SCORED_CATEGORIES:
+        matches = sum(1 for p in _SEO_PATTERNS[category] if p.search(text))
         if matches >= 2:
             return category
 
-    for category in PRODUCT_TYPE_PRIORITY:
-        if category in ("machines", "hoses"):
-            continue
-        for pattern in PRODUCT_PATTERNS.get(category, []):
-            if re.search(pattern, text, re.IGNORECASE):
-                return category
+    for category in _SEO_SCORED_CATEGORIES:
+        if any(p.search(text) for p in _SEO_PATTERNS[category]):
+            return category
 
     return "parts"
 
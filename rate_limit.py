@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Shared request pacing for the one-off Shopify scripts.
+
+A sliding-window limiter: at most `max_calls` requests start in any
+`period`-second window, across every thread of the process. Unlike a fixed
+sleep after each call it doesn't waste the request latency (the wait only
+covers whatever is left of the window) and it still holds when several
+worker threads share one token — a per-thread sleep doesn't.
+
+The daily sync has its own cost-based ThrottleBucket; the limiter is for the
+simpler backfill / generator scripts. retry_delay() is shared by all of them,
+the sync included.
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# 429 and 5xx are worth another try; any other 4xx will fail the same way again
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+RETRY_BASE_DELAY = 5  # seconds; doubles per attempt
+RETRY_MAX_DELAY = 60
+RETRY_AFTER_CAP = 60
+# Writes to Shopify are independent, so a few stay in flight instead of
+# waiting on each round trip; the limiter still caps the overall rate
+WRITE_WORKERS = 4
+
+
+def _log(msg, level='INFO'):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] [{level}] {msg}", flush=True)
+
+
+class SlidingWindowLimiter:
+    def __init__(self, max_calls: int, period: float = 1.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may start, then record it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            time.sleep(wait)
+
+
+def make_session(headers=None):
+    """One keep-alive session for a script's whole run, so calls reuse the
+    connection instead of paying a TLS handshake each time."""
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def retry_delay(attempt, retry_after=None):
+    """Seconds to wait before retry number attempt+1.
+
+    Honours Retry-After (delta-seconds or HTTP-date) when Shopify sent one,
+    otherwise exponential backoff with jitter on the upper half, so worker
+    threads don't retry in lockstep but a blip still gets a few seconds to
+    clear (2.5-5s before the first retry, then 5-10s, 10-20s, ...).
+    """
+    if retry_after:
+        try:
+            seconds = float(retry_after)
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(retry_after)
+                seconds = (when - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                seconds = None
+        # float() also accepts 'nan' / 'inf'; time.sleep(nan) would raise
+        if seconds is not None and math.isfinite(seconds):
+            return min(max(seconds, 0.0), RETRY_AFTER_CAP)
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _is_throttled(result):
+    errors = result.get('errors')
+    return isinstance(errors, list) and any(
+        isinstance(e, dict) and (e.get('extensions') or {}).get('code') == 'THROTTLED' for e in errors
+    )
+
+
+def graphql_post(session, url, query, variables=None, limiter=None, max_retries=3, timeout=30):
+    """POST a GraphQL query and return the parsed response ({} if every
+    attempt was used up).
+
+    429/5xx responses, connection errors and THROTTLED results are retried
+    with retry_delay(); each attempt first waits on `limiter` when given.
+    """
+    payload = {'query': query}
+    if variables:
+        payload['variables'] = variables
+    body = json.dumps(payload)  # encoded once: retries resend the same bytes
+
+    for attempt in range(max_retries):
+        last = attempt == max_retries - 1
+        try:
+            if limiter:
+                limiter.acquire()
+            resp = session.post(url, data=body, timeout=timeout)
+            if resp.status_code in RETRYABLE_STATUS and not last:
+                wait = retry_delay(attempt, resp.headers.get('Retry-After'))
+                _log(f"HTTP {resp.status_code}, retry {attempt+1}/{max_retries} in {wait:.1f}s...", 'WARNING')
+                time.sleep(wait)
+                continue
+            resp.raise_for_status()
+            result = resp.json()
+            # THROTTLED: the query wasn't executed, so it is safe to resend
+            if _is_throttled(result) and not last:
+                wait = retry_delay(attempt)
+                _log(f"Throttled by Shopify, retry {attempt+1}/{max_retries} in {wait:.1f}s...", 'WARNING')
+                time.sleep(wait)
+                continue
+            if 'errors' in result:
+                _log(f"GraphQL errors: {result['errors']}", 'WARNING')
+            return result
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if last:
+                raise
+            wait = retry_delay(attempt)
+            _log(f"Connection error, retry {attempt+1}/{max_retries} in {wait:.1f}s...", 'WARNING')
+            time.sleep(wait)
+    return {}
+
+
+def run_concurrently(fn, items, max_workers=WRITE_WORKERS, on_result=None, progress_every=100):
+    """Call fn(item) for every item with up to max_workers in flight and
+    return how many calls returned truthy. A call that raises is logged and
+    counts as a failure. on_result(item, ok) runs in the calling thread as
+    each call finishes."""
+    items = list(items)
+    succeeded = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fn, item): item for item in items}
+        for done, future in enumerate(as_completed(futures), 1):
+            item = futures[future]
+            try:
+                ok = bool(future.result())
+            except Exception as e:
+                _log(f"  Call failed: {e}", 'WARNING')
+                ok = False
+            succeeded += ok
+            if on_result:
+                on_result(item, ok)
+            if done % progress_every == 0 or done == len(items):
+                _log(f"  Progress: {done}/{len(items)} ({succeeded} ok, {done - succeeded} errors)")
+    return succeeded
@@ -22,17 +22,16 @@ Usage:
 
 import os
 import csv
-import time
 import argparse
-import requests
 from datetime import datetime
 
 from product_content import generate_seo_title, generate_seo_description
+from rate_limit import SlidingWindowLimiter, graphql_post, make_session, run_concurrently
 
 SHOPIFY_STORE = os.environ.get('SHOPIFY_STORE', 'kingsway-janitorial.myshopify.com')
 SHOPIFY_ACCESS_TOKEN = os.environ.get('SHOPIFY_ACCESS_TOKEN', '')
 API_VERSION = '2026-01'
-RATE_LIMIT_DELAY = 0.5
+REQUESTS_PER_SECOND = 4  # productUpdate costs 10 points; restore is 50/s
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 5
 
@@ -52,41 +51,20 @@ class SEOGenerator:
         }
         self.stats = {"processed": 0, "updated": 0, "skipped": 0, "errors": 0}
         self.results = []
+        self.session = make_session(self.headers)
+        self.limiter = SlidingWindowLimiter(REQUESTS_PER_SECOND)
 
     def _graphql(self, query, variables=None):
-        payload = {'query': query}
-        if variables:
-            payload['variables'] = variables
-        for attempt in range(MAX_RETRIES):
-            try:
-                resp = requests.post(self.graphql_url, json=payload, headers=self.headers, timeout=REQUEST_TIMEOUT)
-                if resp.status_code in (429, 503):
-                    wait = min(int(resp.headers.get('Retry-After', (attempt + 1) * 10)), 60)
-                    log(f"HTTP {resp.status_code}, retry {attempt+1}/{MAX_RETRIES} in {wait}s...", 'WARNING')
-                    if attempt < MAX_RETRIES - 1:
-                        time.sleep(wait)
-                        continue
-                resp.raise_for_status()
-                result = resp.json()
-                if 'errors' in result:
-                    log(f"GraphQL errors: {result['errors']}", 'WARNING')
-                return result
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-                if attempt < MAX_RETRIES - 1:
-                    wait = (attempt + 1) * 10
-                    log(f"Connection error, retry {attempt+1}/{MAX_RETRIES} in {wait}s...", 'WARNING')
-                    time.sleep(wait)
-                else:
-                    raise
-        return {}
+        return graphql_post(self.session, self.graphql_url, query, variables, limiter=self.limiter,
+                            max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT)
 
     def get_all_products(self):
         """Fetch all products with their current SEO fields."""
         query = """query ($cursor: String) { products(first: 250, after: $cursor) {
             edges { node { id title handle
-                seo { title description }
-                variants(first: 1) { nodes { sku } } } cursor }
-            pageInfo { hasNextPage } } }"""
+                seo { title }
+                variants(first: 1) { nodes { sku } } } }
+            pageInfo { hasNextPage endCursor } } }"""
         products = []
         cursor = None
         while True:
@@ -99,8 +77,7 @@ class SEOGenerator:
                 print(f"  Fetched {len(products)} products...")
             if not pi.get('hasNextPage'):
                 break
-            cursor = edges[-1]['cursor']
-            time.sleep(RATE_LIMIT_DELAY)
+            cursor = pi['endCursor']
         return products
 
     def update_product_seo(self, product_id, seo_title, seo_description):
@@ -140,7 +117,7 @@ class SEOGenerator:
         print("Processing products...")
         print("-" * 60 + "\n")
 
-        for i, product in enumerate(products, 1):
+        for product in products:
             product_id = product.get("id")
             title = product.get("title", "Unknown")
             handle = product.get("handle", "")
@@ -150,31 +127,31 @@ class SEOGenerator:
             seo_title = generate_seo_title(title, sku)
             seo_description = generate_seo_description(title, sku)
 
-            result = {
+            self.results.append({
                 "id": product_id,
                 "handle": handle,
                 "original_title": title,
                 "seo_title": seo_title,
                 "seo_description": seo_description,
-                "status": "pending"
-            }
-
-            if not dry_run:
-                if self.update_product_seo(product_id, seo_title, seo_description):
-                    result["status"] = "updated"
-                    self.stats["updated"] += 1
-                else:
-                    result["status"] = "error"
-                    self.stats["errors"] += 1
-                time.sleep(RATE_LIMIT_DELAY)
-            else:
-                result["status"] = "dry_run"
+                "status": "dry_run" if dry_run else "pending"
+            })
 
-            self.results.append(result)
+        if dry_run:
+            self.stats["processed"] += len(self.results)
+            print(f"  Processed {len(self.results)}/{len(products)} products...")
+            return self.results
+
+        def record(result, ok):
+            if ok:
+                result["status"] = "updated"
+                self.stats["updated"] += 1
+            else:
+                result["status"] = "error"
+                self.stats["errors"] += 1
             self.stats["processed"] += 1
 
-            if i % 50 == 0 or i == len(products):
-                print(f"  Processed {i}/{len(products)} products...")
+        run_concurrently(lambda r: self.update_product_seo(r["id"], r["seo_title"], r["seo_description"]),
+                         self.results, on_result=record, progress_every=50)
 
         return self.results
 
@@ -31,23 +31,38 @@ CHANGES from v3.4:
   (ProductUpdateInput) for API 2026-01.
 """
 
+import io
 import os
+import codecs
+import itertools
 import re
+import sys
 import csv
 import json
 import time
+import uuid
 import requests
 import threading
-from typing import Dict, List, Optional, Tuple, Set
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from urllib3.util.retry import Retry
+from typing import Dict, FrozenSet, List, Optional, Tuple, Set
+from contextlib import contextmanager
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+try:
+    import orjson  # optional: much faster on the large GraphQL payloads
+except ImportError:
+    orjson = None
+
 from categorizer_v4 import ProductCategorizer
 from product_content import (
     ai_available, build_description, compute_vendor,
     generate_descriptions_ai, generate_seo_description, generate_seo_title,
     strip_html, taxonomy_for_handle,
 )
+from rate_limit import retry_delay
 from shopify_auth import get_access_token
 
 # =============================================================================
@@ -61,7 +76,23 @@ SHOPIFY_ACCESS_TOKEN = get_access_token()
 CSV_URL = 'https://www.johnnyvacstock.com/sigm_all_jv_products/JVWebProducts.csv'
 IMAGE_BASE_URL = 'https://www.johnnyvacstock.com/photos/web/'
 
+# Last downloaded CSV + its ETag/Last-Modified, so unchanged files come back
+# as a 304 with no body (the workflow persists this dir with actions/cache)
+CSV_CACHE_DIR = os.environ.get('CSV_CACHE_DIR', '.jv_cache')
+CSV_CACHE_FILE = os.path.join(CSV_CACHE_DIR, 'JVWebProducts.csv')
+CSV_CACHE_META = os.path.join(CSV_CACHE_DIR, 'JVWebProducts.meta.json')
+SYNC_STATE_FILE = os.path.join(CSV_CACHE_DIR, 'sync_state.json')
+# Read size for streamed downloads (the CSV and bulk query results):
+# iter_lines() reads 512 bytes at a time by default — far too many small
+# reads and decode calls for a multi-MB file
+STREAM_CHUNK_SIZE = 1 << 16
+
 LANGUAGE = 'en'
+TITLE_FIELD = 'ProductTitleEN' if LANGUAGE == 'en' else 'ProductTitleFR'
+DESC_FIELD = 'ProductDescriptionEN' if LANGUAGE == 'en' else 'ProductDescriptionFR'
+# Low-cardinality columns (a few hundred categories over ~10k rows): interned
+# at parse time so every row shares one string object
+INTERNED_CSV_COLUMNS = frozenset({'ProductCategory'})
 DRY_RUN = os.environ.get('DRY_RUN', 'false').lower() == 'true'
 ARCHIVE_MISSING = os.environ.get('ARCHIVE_MISSING', 'true').lower() == 'true'
 
@@ -70,6 +101,11 @@ ARCHIVE_MISSING = os.environ.get('ARCHIVE_MISSING', 'true').lower() == 'true'
 # time stock flips). Set KEEP_OOS_ACTIVE=false to restore the old behavior.
 KEEP_OOS_ACTIVE = os.environ.get('KEEP_OOS_ACTIVE', 'true').lower() == 'true'
 
+# Skip the whole run when the CSV is unchanged (HTTP 304) and the previous
+# run applied everything cleanly. Off by default: Shopify-side drift (orders
+# decrementing stock, manual edits) is only corrected by a full run.
+SKIP_IF_CSV_UNCHANGED = os.environ.get('SKIP_IF_CSV_UNCHANGED', 'false').lower() == 'true'
+
 # Description shorter than this (text chars) counts as "thin" and gets enriched
 MIN_DESCRIPTION_LENGTH = 80
 
@@ -81,15 +117,35 @@ HEADERS = {
     'X-Shopify-Access-Token': SHOPIFY_ACCESS_TOKEN
 }
 
-# Rate limiting - Shopify allows 2/sec for standard, 4/sec for Plus
-RATE_LIMIT_PER_SECOND = 2
+# Rate limiting - GraphQL is cost-based (leaky bucket of query points).
+# These are the Standard-plan numbers; the first response's throttleStatus
+# recalibrates them to whatever the store's plan actually allows.
+BUCKET_CAPACITY = 1000
+BUCKET_RESTORE_RATE = 50  # points/sec
+DEFAULT_QUERY_COST = 10
+THROTTLE_MIN_PACE = 0.25   # never slow below 1/4 of the restore rate
+THROTTLE_PACE_STEP = 0.05  # pace recovered per successful response
 MAX_CONCURRENT = 4
 REQUEST_TIMEOUT = 30
-MAX_RETRIES = 3
+MAX_RETRIES = 3  # backoff between attempts: rate_limit.retry_delay
 
 # Bulk operation settings
-POLL_INTERVAL = 10
+# Status polls back off from 1s to POLL_MAX_DELAY: short operations are
+# noticed within a second or two, long ones aren't polled every second
+POLL_INITIAL_DELAY = 1
+POLL_BACKOFF = 1.5
+POLL_MAX_DELAY = 15
 MAX_POLL_TIME = 3600  # 1 hour max per bulk operation
+# Below this many products the staged upload + polling round trips cost more
+# than just sending the writes directly (a typical daily run is a few dozen)
+BULK_MIN_PRODUCTS = 100
+
+# Aliased mutations per request for the non-bulk write paths (productUpdate
+# costs 10 points, so 25 stays well under the 1000-point single query cap)
+ALIAS_BATCH_SIZE = 25
+
+# Seconds between progress lines in the write loops
+PROGRESS_LOG_INTERVAL = 5
 
 # Tags the sync owns (everything else on a product is preserved)
 MANAGED_TAG_PREFIXES = ('confidence:', 'source:')
@@ -102,54 +158,167 @@ def log(message: str, level: str = 'INFO'):
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     print(f"[{timestamp}] [{level}] {message}", flush=True)
 
+class ProgressLog:
+    """Rate-limited progress lines: at most one per PROGRESS_LOG_INTERVAL
+    seconds, plus the final one, however fast the items complete."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.start = self.last = time.time()
+
+    def due(self, done: int) -> bool:
+        now = time.time()
+        if done >= self.total or now - self.last >= PROGRESS_LOG_INTERVAL:
+            self.last = now
+            return True
+        return False
+
+    def rate(self, done: int) -> float:
+        elapsed = time.time() - self.start
+        return done / elapsed if elapsed > 0 else 0
+
+# =============================================================================
+# HTTP SESSION
+# =============================================================================
+
+def make_session() -> requests.Session:
+    """
+    One pooled keep-alive session for every call the sync makes (saves a TLS
+    handshake per request). Transport retries cover idempotent GETs only —
+    GraphQL POSTs keep their own retry handling in graphql_request().
+    """
+    session = requests.Session()
+    retry = Retry(total=5, backoff_factor=1, status_forcelist=[429, 502, 503, 504],
+                  respect_retry_after_header=True, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENT * 2, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+SESSION = make_session()
+
+# =============================================================================
+# JSON (orjson when installed, stdlib otherwise)
+# =============================================================================
+
+def json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def json_dumps_bytes(obj) -> bytes:
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
 # =============================================================================
 # THREAD-SAFE RATE LIMITER
 # =============================================================================
 
-class RateLimiter:
-    def __init__(self, requests_per_second: float = 2.0):
-        self.requests_per_second = requests_per_second
-        self.requests: List[float] = []
+class ThrottleBucket:
+    """Client-side mirror of Shopify's GraphQL cost bucket.
+
+    Every caller acquire()s before sending, so concurrent workers slow down
+    BEFORE the bucket runs dry instead of finding out from a THROTTLED
+    response. Each response's extensions.cost.throttleStatus resets the
+    estimate to Shopify's own numbers, so drift never accumulates.
+
+    If Shopify still answers THROTTLED (costs were underestimated, or another
+    app shares the bucket) the pace is halved and then creeps back up by a
+    small step per successful response (AIMD), so the sync settles on the
+    throughput the store actually leaves us."""
+
+    def __init__(self, capacity: float = BUCKET_CAPACITY, restore_rate: float = BUCKET_RESTORE_RATE):
+        self.capacity = capacity
+        self.restore_rate = restore_rate
+        self.available = capacity
+        self.pace = 1.0  # fraction of restore_rate we allow ourselves
+        self.updated = time.monotonic()
         self._lock = threading.Lock()
 
-    def throttle(self):
+    def _rate(self) -> float:
+        return self.restore_rate * self.pace
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self._rate())
+        self.updated = now
+
+    def acquire(self, cost: float = DEFAULT_QUERY_COST):
+        while True:
+            with self._lock:
+                self._refill()
+                cost = min(cost, self.capacity)
+                if self.available >= cost:
+                    self.available -= cost
+                    return
+                wait = (cost - self.available) / self._rate()
+            time.sleep(wait)
+
+    def observe(self, throttle_status: Dict, throttled: bool = False):
         with self._lock:
-            now = time.time()
-            self.requests = [t for t in self.requests if now - t < 1.0]
-
-            if len(self.requests) >= self.requests_per_second:
-                oldest = min(self.requests)
-                wait_time = 1.0 - (now - oldest) + 0.05
-                if wait_time > 0:
-                    self._lock.release()
-                    try:
-                        time.sleep(wait_time)
-                    finally:
-                        self._lock.acquire()
-                    return self.throttle()
-
-            self.requests.append(time.time())
+            self.capacity = throttle_status.get('maximumAvailable') or self.capacity
+            self.restore_rate = throttle_status.get('restoreRate') or self.restore_rate
+            self.available = throttle_status.get('currentlyAvailable', self.available)
+            self.updated = time.monotonic()
+            if throttled:
+                self.pace = max(THROTTLE_MIN_PACE, self.pace / 2)
+                self.available = min(self.available, 0)
+            else:
+                self.pace = min(1.0, self.pace + THROTTLE_PACE_STEP)
 
-rate_limiter = RateLimiter(RATE_LIMIT_PER_SECOND)
+rate_limiter = ThrottleBucket()
 
 # =============================================================================
 # GRAPHQL HELPERS
 # =============================================================================
 
-def graphql_request(query: str, variables: Optional[Dict] = None, use_rate_limit: bool = True) -> Dict:
+def is_throttled(result: Dict) -> bool:
+    errors = result.get('errors')
+    return isinstance(errors, list) and any(
+        isinstance(e, dict) and (e.get('extensions') or {}).get('code') == 'THROTTLED' for e in errors
+    )
+
+def graphql_request(query: str, variables: Optional[Dict] = None, use_rate_limit: bool = True,
+                    cost: float = DEFAULT_QUERY_COST) -> Dict:
     """Make a GraphQL request to Shopify"""
     if use_rate_limit:
-        rate_limiter.throttle()
+        rate_limiter.acquire(cost)
 
     payload = {'query': query}
     if variables:
         payload['variables'] = variables
+    # Encoded once: retries resend the same bytes
+    body = json_dumps_bytes(payload)
 
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.post(GRAPHQL_URL, json=payload, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+            response = SESSION.post(GRAPHQL_URL, data=body, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+            # 429 means the request was rejected before running, so it is
+            # always safe to resend (other errors may have partly applied)
+            if response.status_code == 429 and attempt < MAX_RETRIES - 1:
+                wait = retry_delay(attempt, response.headers.get('Retry-After'))
+                log(f"Rate limited (429), retry {attempt + 1}/{MAX_RETRIES} in {wait:.1f}s...", 'WARNING')
+                time.sleep(wait)
+                continue
             response.raise_for_status()
-            result = response.json()
+            result = json_loads(response.content)
+
+            throttled = is_throttled(result)
+            throttle_status = result.get('extensions', {}).get('cost', {}).get('throttleStatus')
+            if throttle_status:
+                rate_limiter.observe(throttle_status, throttled)
+
+            # THROTTLED means the query was not executed; wait for the
+            # (now slower) bucket to refill and send it again. Calls that
+            # bypass the bucket (bulk operations, polling) just back off.
+            if throttled and attempt < MAX_RETRIES - 1:
+                if use_rate_limit:
+                    log(f"Throttled by Shopify, retry {attempt + 1}/{MAX_RETRIES}...", 'WARNING')
+                    rate_limiter.acquire(cost)
+                else:
+                    wait = retry_delay(attempt)
+                    log(f"Throttled by Shopify, retry {attempt + 1}/{MAX_RETRIES} in {wait:.1f}s...", 'WARNING')
+                    time.sleep(wait)
+                continue
 
             if 'errors' in result:
                 log(f"GraphQL errors: {result['errors']}", 'WARNING')
@@ -158,14 +327,39 @@ def graphql_request(query: str, variables: Optional[Dict] = None, use_rate_limit
 
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
             if attempt < MAX_RETRIES - 1:
-                wait = (attempt + 1) * 5
-                log(f"Connection error, retry {attempt + 1}/{MAX_RETRIES} in {wait}s...", 'WARNING')
+                wait = retry_delay(attempt)
+                log(f"Connection error, retry {attempt + 1}/{MAX_RETRIES} in {wait:.1f}s...", 'WARNING')
                 time.sleep(wait)
             else:
                 raise
 
     return {}
 
+def graphql_aliased_batch(field: str, arg_types: Dict[str, str], inputs: List[Dict],
+                          selection: str) -> List[Dict]:
+    """Run the same mutation for several inputs in ONE request using aliases
+    (m0: field(...) m1: field(...) ...). Returns each alias' payload in input
+    order ({} when Shopify returned nothing for it).
+
+    A top-level error with no data (e.g. one input failing variable coercion)
+    rejects the whole request without running any alias, so the inputs are
+    resent one at a time and only the bad one fails."""
+    var_defs, calls, variables = [], [], {}
+    for i, args in enumerate(inputs):
+        for name, gql_type in arg_types.items():
+            var_defs.append(f"${name}{i}: {gql_type}")
+            variables[f"{name}{i}"] = args[name]
+        arg_list = ', '.join(f"{name}: ${name}{i}" for name in arg_types)
+        calls.append(f"m{i}: {field}({arg_list}) {{ {selection} }}")
+
+    query = f"mutation batch({', '.join(var_defs)}) {{ {' '.join(calls)} }}"
+    result = graphql_request(query, variables, cost=DEFAULT_QUERY_COST * len(inputs))
+    if result.get('errors') and not result.get('data') and len(inputs) > 1:
+        log(f"Batch of {len(inputs)} {field} rejected — resending one at a time", 'WARNING')
+        return [graphql_aliased_batch(field, arg_types, [args], selection)[0] for args in inputs]
+    data = result.get('data') or {}
+    return [data.get(f"m{i}") or {} for i in range(len(inputs))]
+
 # =============================================================================
 # UTILITY FUNCTIONS
 # =============================================================================
@@ -186,6 +380,13 @@ def normalize_price(price_str: str) -> str:
     except (ValueError, TypeError):
         return "0.00"
 
+def parse_inventory(value: str) -> int:
+    """CSV stock level as an int; blank or malformed values count as 0."""
+    try:
+        return int(float(value or 0))
+    except (ValueError, TypeError, OverflowError):
+        return 0
+
 def build_metafields(sku: str) -> List[Dict]:
     """custom.mpn = JohnnyVac SKU. Google accepts Brand + MPN instead of GTIN."""
     metafields = []
@@ -199,12 +400,30 @@ def build_metafields(sku: str) -> List[Dict]:
     return metafields
 
 def merge_tags(existing_tags: List[str], managed_tags: List[str], known_handles: Set[str]) -> List[str]:
-    """Replace only the tags this sync owns; preserve everything added manually."""
+    """
+    Replace only the tags this sync owns; preserve everything added manually.
+
+    The result is canonical (stripped, no empties, de-duplicated
+    case-insensitively like Shopify does) so it compares equal to what
+    Shopify hands back and doesn't cause a tag update on every run. The
+    managed-tag checks fold case the same way, so a re-cased managed tag
+    (e.g. a stale 'Bags' handle) is replaced rather than kept as manual.
+    """
+    handles = {h.lower() for h in known_handles}
     preserved = [
         t for t in (existing_tags or [])
-        if not t.startswith(MANAGED_TAG_PREFIXES) and t not in known_handles
+        if not t.strip().lower().startswith(MANAGED_TAG_PREFIXES) and t.strip().lower() not in handles
     ]
-    return sorted(set(preserved) | set(managed_tags))
+    merged: Dict[str, str] = {}
+    for tag in preserved + list(managed_tags):
+        tag = tag.strip()
+        if tag:
+            merged.setdefault(tag.lower(), tag)
+    return sorted(merged.values())
+
+def tag_set(tags: List[str]) -> FrozenSet[str]:
+    """Tags as Shopify compares them: trimmed, case-insensitive, unordered"""
+    return frozenset(t.strip().lower() for t in tags or [] if t.strip())
 
 # =============================================================================
 # DESIRED STATE (per CSV product)
@@ -214,9 +433,9 @@ def build_desired_state(product: Dict) -> Dict:
     """Compute everything we want Shopify to hold for this CSV row."""
     sku = product.get('SKU', '')
     category_info = product.get('category', {})
-    title = product.get('ProductTitleEN' if LANGUAGE == 'en' else 'ProductTitleFR', '') or sku
-    jv_desc = clean_html(product.get('ProductDescriptionEN' if LANGUAGE == 'en' else 'ProductDescriptionFR', ''))
-    inventory = int(float(product.get('Inventory', '0') or 0))
+    title = product.get(TITLE_FIELD, '') or sku
+    jv_desc = clean_html(product.get(DESC_FIELD, ''))
+    inventory = parse_inventory(product.get('Inventory', '0'))
     handle_tag = category_info.get('handle', 'uncategorized')
 
     return {
@@ -245,29 +464,176 @@ def build_desired_state(product: Dict) -> Dict:
 # CSV FETCHING
 # =============================================================================
 
-def fetch_csv_data() -> Tuple[List[Dict], List[str]]:
-    log(f"Fetching CSV from: {CSV_URL}")
+def _load_csv_cache_meta() -> Dict:
+    if not os.path.exists(CSV_CACHE_FILE):
+        return {}
+    try:
+        with open(CSV_CACHE_META, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# Validators (ETag / Last-Modified) of the CSV copy this run parsed; a clean
+# run records them in SYNC_STATE_FILE. The cache meta can't stand in for
+# them: any run refreshes it, dry runs and failed runs included.
+_csv_validators: Dict[str, Optional[str]] = {}
+
+def _conditional_headers(validators: Dict) -> Dict[str, str]:
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+class _TeeReader(io.RawIOBase):
+    """Read-only stream over an iterator of byte chunks that also writes
+    every chunk to `sink` as it is consumed."""
+
+    def __init__(self, chunks, sink):
+        self._chunks = chunks
+        self._sink = sink
+        self._pending = memoryview(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._sink.write(chunk)
+            self._pending = memoryview(chunk)
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+def sniff_encoding(sample: bytes) -> str:
+    """Encoding for a download served without a charset, guessed from its
+    first chunk the way requests' apparent_encoding would guess from the
+    whole body (UTF-8 when it decodes as such)."""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    guessed = (chardet.detect(sample) or {}).get('encoding') if chardet else None
+    encoding = guessed or 'cp1252'
+    log(f"  CSV has no charset and isn't UTF-8 — decoding as {encoding}", 'WARNING')
+    return encoding
+
+@contextmanager
+def csv_lines():
+    """
+    Yield the CSV as an iterator of text lines. Sends the cached validators
+    so an unchanged file is served from the local copy on a 304; otherwise
+    streams the download (rows are parsed as they arrive) and refreshes the
+    cache once the whole file has been read.
+    """
+    meta = _load_csv_cache_meta()
+    headers = _conditional_headers(meta)
+
+    with SESSION.get(CSV_URL, timeout=60, stream=True, headers=headers) as response:
+        if response.status_code == 304:
+            log("  CSV not modified since last run — using cached copy")
+            _csv_validators.update(etag=meta.get('etag'), last_modified=meta.get('last_modified'))
+            with open(CSV_CACHE_FILE, 'r', encoding=meta.get('encoding', 'utf-8'),
+                      errors='replace', newline='') as f:
+                yield f
+            return
+
+        response.raise_for_status()
+        chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        if response.encoding is None:
+            # No charset: guess from the first chunk (recorded in the cache
+            # meta below so the 304 path decodes the same way)
+            first = next(chunks, b'')
+            response.encoding = sniff_encoding(first)
+            chunks = itertools.chain([first], chunks)
+        _csv_validators.update(etag=response.headers.get('ETag'),
+                               last_modified=response.headers.get('Last-Modified'))
+
+        os.makedirs(CSV_CACHE_DIR, exist_ok=True)
+        tmp_path = CSV_CACHE_FILE + '.tmp'
+        # The raw bytes go to the cache and the parser reads them through the
+        # same text layer as the 304 path's open(), so both parse identically
+        # (iter_lines() would drop line endings inside quoted fields)
+        with open(tmp_path, 'wb') as cache:
+            raw = _TeeReader(chunks, cache)
+            # errors='replace' like response.text: a stray byte doesn't abort the sync
+            yield io.TextIOWrapper(io.BufferedReader(raw, STREAM_CHUNK_SIZE),
+                                   encoding=response.encoding, errors='replace', newline='')
+
+        os.replace(tmp_path, CSV_CACHE_FILE)
+        with open(CSV_CACHE_META, 'w', encoding='utf-8') as f:
+            json.dump({
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'encoding': response.encoding,
+            }, f)
+
+def csv_unchanged_since_clean_run() -> bool:
+    """True when the last run finished cleanly and the CSV server answers the
+    validators of the file that run synced with 304 Not Modified."""
+    try:
+        with open(SYNC_STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return False
+    headers = _conditional_headers(state)
+    if not state.get('clean') or not headers:
+        return False
+
+    with SESSION.get(CSV_URL, timeout=60, stream=True, headers=headers) as response:
+        return response.status_code == 304
 
-    response = requests.get(CSV_URL, timeout=60)
-    response.raise_for_status()
-    lines = response.text.splitlines()
+def save_sync_state(clean: bool):
+    os.makedirs(CSV_CACHE_DIR, exist_ok=True)
+    with open(SYNC_STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            'clean': clean,
+            'etag': _csv_validators.get('etag'),
+            'last_modified': _csv_validators.get('last_modified'),
+            'finished_at': datetime.now().isoformat(),
+        }, f)
 
-    reader = csv.DictReader(lines, delimiter=';')
+def fetch_csv_data() -> Tuple[List[Dict], List[str]]:
+    log(f"Fetching CSV from: {CSV_URL}")
 
     products = []
     seen_skus: Set[str] = set()
     duplicate_skus: List[str] = []
 
-    for row in reader:
-        sku = (row.get('SKU') or '').strip()
-        if not sku:
-            continue
-        if sku in seen_skus:
-            duplicate_skus.append(sku)
-            continue
-        seen_skus.add(sku)
-        cleaned_row = {k: (v.strip() if v else '') for k, v in row.items()}
-        products.append(cleaned_row)
+    with csv_lines() as lines:
+        # Plain csv.reader + one dict per kept row: DictReader would build a
+        # dict for every row only for us to copy it again to strip values
+        reader = csv.reader(lines, delimiter=';')
+        header = next(reader, [])
+        width = len(header)
+        try:
+            sku_idx = header.index('SKU')
+        except ValueError:
+            sku_idx = None
+        intern_idx = [i for i, name in enumerate(header) if name in INTERNED_CSV_COLUMNS]
+
+        for row in reader:
+            if not row:
+                continue
+            sku = row[sku_idx].strip() if sku_idx is not None and sku_idx < len(row) else ''
+            if not sku:
+                continue
+            if sku in seen_skus:
+                duplicate_skus.append(sku)
+                continue
+            seen_skus.add(sku)
+            if len(row) < width:
+                row += [''] * (width - len(row))
+            values = [v.strip() for v in row]
+            for i in intern_idx:
+                values[i] = sys.intern(values[i])
+            products.append(dict(zip(header, values)))
 
     log(f"✓ Parsed {len(products)} products from CSV")
     if duplicate_skus:
@@ -312,6 +678,13 @@ def get_default_location_id() -> Optional[str]:
 # BULK QUERY - Fetch existing products (FAST!)
 # =============================================================================
 
+def poll_delays():
+    """Sleep lengths for a bulk operation status poll loop."""
+    delay = POLL_INITIAL_DELAY
+    while True:
+        yield delay
+        delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+
 def get_existing_products_bulk() -> Dict[str, Dict]:
     """Use bulk operation to fetch all existing products - this is the fast part!"""
     log("Starting bulk query for existing products...")
@@ -395,13 +768,14 @@ def poll_and_download_bulk_results() -> Dict[str, Dict]:
     """
 
     start_time = time.time()
+    delays = poll_delays()
 
     while time.time() - start_time < MAX_POLL_TIME:
         result = graphql_request(query, use_rate_limit=False)
         operation = result.get('data', {}).get('currentBulkOperation')
 
         if not operation:
-            time.sleep(POLL_INTERVAL)
+            time.sleep(next(delays))
             continue
 
         status = operation.get('status')
@@ -416,21 +790,23 @@ def poll_and_download_bulk_results() -> Dict[str, Dict]:
         elif status in ['FAILED', 'CANCELED']:
             raise Exception(f"Bulk operation failed: {operation.get('errorCode')}")
 
-        time.sleep(POLL_INTERVAL)
+        time.sleep(next(delays))
 
     raise Exception("Bulk operation timed out")
 
 def _existing_from_product_node(obj: Dict) -> Dict:
+    # vendor/type/status/category/tags repeat across thousands of products;
+    # interning keeps one copy of each instead of one per parsed JSON line
     return {
         'product_id': obj['id'],
         'title': obj.get('title', ''),
         'handle': obj.get('handle', ''),
-        'vendor': obj.get('vendor', ''),
-        'product_type': obj.get('productType', ''),
-        'status': obj.get('status', 'ACTIVE'),
-        'tags': obj.get('tags') or [],
+        'vendor': sys.intern(obj.get('vendor') or ''),
+        'product_type': sys.intern(obj.get('productType') or ''),
+        'status': sys.intern(obj.get('status') or 'ACTIVE'),
+        'tags': [sys.intern(t) for t in obj.get('tags') or []],
         'description_text': strip_html(obj.get('description', '') or ''),
-        'category_id': (obj.get('category') or {}).get('id', '') or '',
+        'category_id': sys.intern((obj.get('category') or {}).get('id', '') or ''),
         'seo_title': (obj.get('seo') or {}).get('title', '') or '',
     }
 
@@ -438,31 +814,33 @@ def download_bulk_results(url: str) -> Dict[str, Dict]:
     """Download and parse bulk query results"""
     log("Downloading bulk results...")
 
-    response = requests.get(url, timeout=120)
-    response.raise_for_status()
-
     products = {}
     current_product = None
 
-    for line in response.text.strip().split('\n'):
-        if not line:
-            continue
-        obj = json.loads(line)
-
-        # Product line (has id but not sku)
-        if 'id' in obj and 'sku' not in obj and '__parentId' not in obj:
-            current_product = _existing_from_product_node(obj)
-        # Variant line (has sku and __parentId)
-        elif 'sku' in obj:
-            sku = obj.get('sku')
-            if sku and current_product:
-                products[sku] = {
-                    **current_product,
-                    'variant_id': obj['id'],
-                    'inventory_item_id': (obj.get('inventoryItem') or {}).get('id', ''),
-                    'price': obj.get('price', '0'),
-                    'inventory': obj.get('inventoryQuantity', 0)
-                }
+    # Parse line by line as the file streams in — the whole catalog is never
+    # held in memory as one string
+    with SESSION.get(url, timeout=120, stream=True) as response:
+        response.raise_for_status()
+
+        for line in response.iter_lines(chunk_size=STREAM_CHUNK_SIZE):
+            if not line:
+                continue
+            obj = json_loads(line)
+
+            # Product line (has id but not sku)
+            if 'id' in obj and 'sku' not in obj and '__parentId' not in obj:
+                current_product = _existing_from_product_node(obj)
+            # Variant line (has sku and __parentId)
+            elif 'sku' in obj:
+                sku = (obj.get('sku') or '').strip()
+                if sku and current_product:
+                    products[sku] = {
+                        **current_product,
+                        'variant_id': obj['id'],
+                        'inventory_item_id': (obj.get('inventoryItem') or {}).get('id', ''),
+                        'price': normalize_price(obj.get('price')),
+                        'inventory': obj.get('inventoryQuantity') or 0
+                    }
 
     log(f"✓ Parsed {len(products)} existing products from Shopify")
     return products
@@ -501,9 +879,8 @@ def get_existing_products_paginated() -> Dict[str, Dict]:
                         }
                     }
                 }
-                cursor
             }
-            pageInfo { hasNextPage }
+            pageInfo { hasNextPage endCursor }
         }
     }
     """
@@ -520,14 +897,14 @@ def get_existing_products_paginated() -> Dict[str, Dict]:
             base = _existing_from_product_node(node)
             for var_edge in node.get('variants', {}).get('edges', []):
                 variant = var_edge['node']
-                sku = variant.get('sku')
+                sku = (variant.get('sku') or '').strip()
                 if sku:
                     products[sku] = {
                         **base,
                         'variant_id': variant['id'],
                         'inventory_item_id': (variant.get('inventoryItem') or {}).get('id', ''),
-                        'price': variant.get('price', '0'),
-                        'inventory': variant.get('inventoryQuantity', 0)
+                        'price': normalize_price(variant.get('price')),
+                        'inventory': variant.get('inventoryQuantity') or 0
                     }
 
         if page % 20 == 0:
@@ -535,11 +912,18 @@ def get_existing_products_paginated() -> Dict[str, Dict]:
 
         if not page_info.get('hasNextPage'):
             break
-        cursor = edges[-1]['cursor']
+        cursor = page_info['endCursor']
 
     log(f"✓ Fetched {len(products)} existing products")
     return products
 
+def fetch_existing_products() -> Dict[str, Dict]:
+    try:
+        return get_existing_products_bulk()
+    except Exception as e:
+        log(f"Bulk query failed ({e}), using paginated fallback...", 'WARNING')
+        return get_existing_products_paginated()
+
 # =============================================================================
 # DELTA CALCULATION
 # =============================================================================
@@ -565,11 +949,11 @@ def calculate_delta(
         desired = build_desired_state(product)
         product['_desired'] = desired
 
-        if sku not in existing_products:
+        existing = existing_products.get(sku)
+        if existing is None:
             to_create.append(product)
             continue
 
-        existing = existing_products[sku]
         final_tags = merge_tags(existing.get('tags', []), desired['managed_tags'], known_handles)
         product['_final_tags'] = final_tags
 
@@ -579,10 +963,10 @@ def calculate_delta(
                 existing['product_type'] != desired['product_type'] or
                 existing['status'] != desired['status']
             ),
-            'price': normalize_price(existing['price']) != desired['price'],
-            'inventory': existing.get('inventory', 0) != desired['inventory'],
+            'price': existing['price'] != desired['price'],
+            'inventory': existing['inventory'] != desired['inventory'],
             'vendor': existing.get('vendor', '') != desired['vendor'],
-            'tags': set(existing.get('tags', [])) != set(final_tags),
+            'tags': tag_set(existing.get('tags', [])) != tag_set(final_tags),
             'seo': not existing.get('seo_title'),
             'description': len(existing.get('description_text', '')) < MIN_DESCRIPTION_LENGTH,
             'category': bool(desired['category_gid']) and existing.get('category_id', '') != desired['category_gid'],
@@ -704,6 +1088,14 @@ def build_create_input(product: Dict, location_id: Optional[str]) -> Dict:
         product_input["category"] = d['category_gid']
     return product_input
 
+# Delta flags that productUpdate writes; price and inventory have their own
+# mutations, so a product with only those changes skips productUpdate
+PRODUCT_FIELD_FLAGS = ('core', 'vendor', 'tags', 'seo', 'description', 'category')
+
+def has_product_field_changes(product: Dict) -> bool:
+    flags = product.get('_flags', {})
+    return any(flags.get(k) for k in PRODUCT_FIELD_FLAGS)
+
 def build_update_input(product: Dict) -> Dict:
     """ProductUpdateInput for an existing product (product-level fields only;
     price goes through productVariantsBulkUpdate, inventory through
@@ -787,68 +1179,69 @@ def create_product(product_data: Dict) -> Optional[str]:
 # PRODUCT UPDATE - productUpdate + productVariantsBulkUpdate
 # =============================================================================
 
-PRODUCT_UPDATE_MUTATION = """
-mutation productUpdate($product: ProductUpdateInput!) {
-    productUpdate(product: $product) {
-        product {
-            id
-        }
-        userErrors {
-            field
-            message
-        }
-    }
-}
-"""
-
-VARIANT_PRICE_MUTATION = """
-mutation productVariantsBulkUpdate($productId: ID!, $variants: [ProductVariantsBulkInput!]!) {
-    productVariantsBulkUpdate(productId: $productId, variants: $variants) {
-        productVariants {
-            id
-        }
-        userErrors {
-            field
-            message
-        }
-    }
-}
-"""
-
-def update_product(product_data: Dict) -> bool:
-    """Update an existing product (individual fallback path)."""
-    existing = product_data['_existing']
-    d = product_data['_desired']
+def apply_prices(batch: List[Dict]) -> List[Dict]:
+    """Write new variant prices with one aliased productVariantsBulkUpdate
+    request. Returns the products whose price was applied."""
+    payloads = graphql_aliased_batch(
+        'productVariantsBulkUpdate',
+        {'productId': 'ID!', 'variants': '[ProductVariantsBulkInput!]!'},
+        [{'productId': p['_existing']['product_id'],
+          'variants': [{'id': p['_existing']['variant_id'], 'price': p['_desired']['price']}]}
+         for p in batch],
+        'productVariants { id } userErrors { field message }',
+    )
 
+    applied = []
+    for product_data, payload in zip(batch, payloads):
+        if payload.get('productVariants') and not payload.get('userErrors'):
+            applied.append(product_data)
+        else:
+            log(f"Update variant {product_data['_desired']['sku']} failed: {payload.get('userErrors')}", 'WARNING')
+    return applied
+
+def update_products(batch: List[Dict]) -> int:
+    """Update existing products with one aliased productUpdate request (only
+    those with product-level changes), then one aliased price request for
+    those whose price changed (individual fallback path). Returns how many
+    products were updated."""
     if DRY_RUN:
-        return True
-
-    result = graphql_request(PRODUCT_UPDATE_MUTATION, {"product": build_update_input(product_data)})
-
-    errors = result.get('data', {}).get('productUpdate', {}).get('userErrors', [])
-    if errors:
-        log(f"Update product {d['sku']} failed: {errors}", 'WARNING')
-        return False
-
-    if product_data.get('_flags', {}).get('price'):
-        result = graphql_request(VARIANT_PRICE_MUTATION, {
-            "productId": existing['product_id'],
-            "variants": [{"id": existing['variant_id'], "price": d['price']}]
-        })
-        errors = result.get('data', {}).get('productVariantsBulkUpdate', {}).get('userErrors', [])
-        if errors:
-            log(f"Update variant {d['sku']} failed: {errors}", 'WARNING')
-            # Don't return False - product was updated, just variant failed
-
-    return True
+        return len(batch)
+
+    changed = [p for p in batch if has_product_field_changes(p)]
+    updated = []
+    if changed:
+        payloads = graphql_aliased_batch(
+            'productUpdate', {'product': 'ProductUpdateInput!'},
+            [{'product': build_update_input(p)} for p in changed],
+            'product { id } userErrors { field message }',
+        )
+        for product_data, payload in zip(changed, payloads):
+            if payload.get('product') and not payload.get('userErrors'):
+                updated.append(product_data)
+            else:
+                log(f"Update product {product_data['_desired']['sku']} failed: {payload.get('userErrors')}", 'WARNING')
+
+    # A failed price write doesn't count against a product that was itself
+    # updated — but for a price-only change the price is the whole update
+    price_only = [p for p in batch if not has_product_field_changes(p) and p.get('_flags', {}).get('price')]
+    priced = [p for p in updated if p.get('_flags', {}).get('price')] + price_only
+    applied = apply_prices(priced) if priced else []
+    applied_ids = {id(p) for p in applied}
+
+    # Inventory-only changes are written by sync_inventory_quantities()
+    inventory_only = sum(
+        1 for p in batch
+        if not has_product_field_changes(p) and not p.get('_flags', {}).get('price')
+    )
+    return len(updated) + sum(1 for p in price_only if id(p) in applied_ids) + inventory_only
 
 # =============================================================================
 # INVENTORY SYNC — inventorySetQuantities, batched
 # =============================================================================
 
 INVENTORY_SET_MUTATION = """
-mutation inventorySetQuantities($input: InventorySetQuantitiesInput!) {
-    inventorySetQuantities(input: $input) {
+mutation inventorySetQuantities($input: InventorySetQuantitiesInput!, $idempotencyKey: String!) {
+    inventorySetQuantities(input: $input) @idempotent(key: $idempotencyKey) {
         inventoryAdjustmentGroup {
             createdAt
         }
@@ -884,6 +1277,7 @@ def sync_inventory_quantities(products: List[Dict]) -> int:
 
     updated = 0
     CHUNK = 250
+    progress = ProgressLog(len(changed))
     for start in range(0, len(changed), CHUNK):
         chunk = changed[start:start + CHUNK]
         quantities = [{
@@ -892,18 +1286,22 @@ def sync_inventory_quantities(products: List[Dict]) -> int:
             "quantity": p['_desired']['inventory'],
         } for p in chunk]
 
+        # One key per batch: graphql_request() resends the same payload on a
+        # lost response, and Shopify applies a given key only once
         result = graphql_request(INVENTORY_SET_MUTATION, {"input": {
             "name": "available",
             "reason": "correction",
             "ignoreCompareQuantity": True,
             "quantities": quantities,
-        }})
+        }, "idempotencyKey": str(uuid.uuid4())})
         errors = result.get('data', {}).get('inventorySetQuantities', {}).get('userErrors', [])
         if errors:
             log(f"  Inventory batch errors: {errors[:3]}{'...' if len(errors) > 3 else ''}", 'WARNING')
         else:
             updated += len(chunk)
-        log(f"  Inventory progress: {min(start + CHUNK, len(changed))}/{len(changed)}")
+        done = min(start + CHUNK, len(changed))
+        if progress.due(done):
+            log(f"  Inventory progress: {done}/{len(changed)}")
 
     log(f"✓ Inventory synced for {updated} products")
     return updated
@@ -912,13 +1310,43 @@ def sync_inventory_quantities(products: List[Dict]) -> int:
 # BULK OPERATIONS - Try bulk first, fallback to individual
 # =============================================================================
 
+CURRENT_BULK_MUTATION_QUERY = """
+query {
+  currentBulkOperation(type: MUTATION) {
+    id
+    status
+    errorCode
+    objectCount
+    rootObjectCount
+    url
+  }
+}
+"""
+
+def wait_for_running_bulk_mutation() -> bool:
+    """A run that hit the job timeout leaves its bulk mutation running on
+    Shopify's side, and a new one can't start until it ends. Wait for it
+    (it is applying the same kind of changes) instead of failing into the
+    per-product fallback. False if it is still running after MAX_POLL_TIME."""
+    start_time = time.time()
+    delays = poll_delays()
+    while time.time() - start_time < MAX_POLL_TIME:
+        result = graphql_request(CURRENT_BULK_MUTATION_QUERY, use_rate_limit=False)
+        operation = result.get('data', {}).get('currentBulkOperation') or {}
+        status = operation.get('status')
+        if status not in ('CREATED', 'RUNNING', 'CANCELING'):
+            return True
+        log(f"  Previous bulk mutation still {status} "
+            f"({operation.get('rootObjectCount', 0)} processed), waiting...")
+        time.sleep(next(delays))
+    return False
+
 def run_bulk_mutation(jsonl_lines: List[Dict], mutation: str, expected_count: int,
-                      label: str) -> Tuple[bool, int]:
-    """Stage a JSONL file and run a bulkOperationRunMutation with it."""
-    jsonl_file = 'bulk_input.jsonl'
-    with open(jsonl_file, 'w', encoding='utf-8') as f:
-        for line in jsonl_lines:
-            f.write(json.dumps(line) + '\n')
+                      label: str) -> Tuple[bool, Set[int]]:
+    """Stage a JSONL file and run a bulkOperationRunMutation with it.
+    Returns (success, line numbers of the rows that were applied)."""
+    # Built in memory and uploaded as-is: no temp file written and read back
+    jsonl_payload = b''.join(json_dumps_bytes(line) + b'\n' for line in jsonl_lines)
 
     staged_mutation = """
     mutation {
@@ -939,12 +1367,16 @@ def run_bulk_mutation(jsonl_lines: List[Dict], mutation: str, expected_count: in
     """
 
     try:
+        if not wait_for_running_bulk_mutation():
+            log(f"Previous bulk mutation still running — skipping bulk {label}", 'WARNING')
+            return False, set()
+
         result = graphql_request(staged_mutation, use_rate_limit=False)
 
         errors = result.get('data', {}).get('stagedUploadsCreate', {}).get('userErrors', [])
         if errors:
             log(f"Staged upload error: {errors}", 'WARNING')
-            return False, 0
+            return False, set()
 
         target = result['data']['stagedUploadsCreate']['stagedTargets'][0]
         upload_url = target['url']
@@ -952,10 +1384,9 @@ def run_bulk_mutation(jsonl_lines: List[Dict], mutation: str, expected_count: in
         # The 'key' parameter is what stagedUploadPath expects, not the full URL
         staged_path = params.get('key', target['resourceUrl'])
 
-        with open(jsonl_file, 'rb') as f:
-            files = {'file': ('bulk_input.jsonl', f, 'text/jsonl')}
-            upload_response = requests.post(upload_url, data=params, files=files, timeout=300)
-            upload_response.raise_for_status()
+        files = {'file': ('bulk_input.jsonl', jsonl_payload, 'text/jsonl')}
+        upload_response = SESSION.post(upload_url, data=params, files=files, timeout=300)
+        upload_response.raise_for_status()
 
         log(f"✓ JSONL uploaded, starting bulk {label}...")
 
@@ -976,13 +1407,13 @@ def run_bulk_mutation(jsonl_lines: List[Dict], mutation: str, expected_count: in
         errors = result.get('data', {}).get('bulkOperationRunMutation', {}).get('userErrors', [])
         if errors:
             log(f"Bulk mutation error: {errors}", 'WARNING')
-            return False, 0
+            return False, set()
 
         return poll_bulk_mutation(expected_count)
 
     except Exception as e:
         log(f"Bulk {label} failed: {e}", 'WARNING')
-        return False, 0
+        return False, set()
 
 
 def try_bulk_create(products: List[Dict]) -> Tuple[bool, int]:
@@ -1001,7 +1432,8 @@ def try_bulk_create(products: List[Dict]) -> Tuple[bool, int]:
     mutation = ("mutation call($input: ProductSetInput!, $synchronous: Boolean!) "
                 "{ productSet(input: $input, synchronous: $synchronous) "
                 "{ product { id } userErrors { field message } } }")
-    return run_bulk_mutation(lines, mutation, len(products), 'create')
+    success, applied = run_bulk_mutation(lines, mutation, len(products), 'create')
+    return success, len(applied)
 
 
 def try_bulk_update(products: List[Dict]) -> Tuple[bool, int]:
@@ -1009,21 +1441,27 @@ def try_bulk_update(products: List[Dict]) -> Tuple[bool, int]:
     if not products or DRY_RUN:
         return False, 0
 
+    changed = [p for p in products if has_product_field_changes(p)]
+    if not changed:
+        return True, 0
+
     log("Attempting bulk update (fast method)...")
-    lines = [{"product": build_update_input(p)} for p in products]
+    lines = [{"product": build_update_input(p)} for p in changed]
 
     mutation = ("mutation call($product: ProductUpdateInput!) "
                 "{ productUpdate(product: $product) "
                 "{ product { id } userErrors { field message } } }")
-    return run_bulk_mutation(lines, mutation, len(products), 'update')
+    success, applied = run_bulk_mutation(lines, mutation, len(changed), 'update')
+    return success, len(applied)
 
 
-def try_bulk_price_update(products: List[Dict]) -> Tuple[bool, int]:
-    """Apply price changes via bulk productVariantsBulkUpdate.
+def try_bulk_price_update(products: List[Dict]) -> Tuple[bool, List[Dict]]:
+    """Apply price changes via bulk productVariantsBulkUpdate. Returns
+    (success, products whose price was applied).
     (v3.x never updated prices in the bulk path at all.)"""
     priced = [p for p in products if p.get('_flags', {}).get('price')]
     if not priced or DRY_RUN:
-        return True, 0
+        return True, []
 
     log(f"Applying {len(priced)} price changes (bulk)...")
     lines = [{
@@ -1034,34 +1472,47 @@ def try_bulk_price_update(products: List[Dict]) -> Tuple[bool, int]:
     mutation = ("mutation call($productId: ID!, $variants: [ProductVariantsBulkInput!]!) "
                 "{ productVariantsBulkUpdate(productId: $productId, variants: $variants) "
                 "{ productVariants { id } userErrors { field message } } }")
-    return run_bulk_mutation(lines, mutation, len(priced), 'price update')
+    success, applied = run_bulk_mutation(lines, mutation, len(priced), 'price update')
+    return success, [priced[i] for i in sorted(applied)]
 
 
-def poll_bulk_mutation(expected_count: int) -> Tuple[bool, int]:
-    """Poll bulk mutation until complete"""
+def read_bulk_mutation_results(url: str) -> Set[int]:
+    """Line numbers (0-based, input order) of the bulk mutation rows that
+    succeeded — no top-level errors, a payload, and no userErrors."""
+    succeeded = set()
+    failed = 0
+    with SESSION.get(url, timeout=120, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(chunk_size=STREAM_CHUNK_SIZE):
+            if not line:
+                continue
+            row = json_loads(line)
+            payload = next(iter((row.get('data') or {}).values()), None)
+            if row.get('errors') or not payload or payload.get('userErrors'):
+                failed += 1
+                if failed <= 5:
+                    log(f"  Bulk row {row.get('__lineNumber')} failed: "
+                        f"{row.get('errors') or (payload or {}).get('userErrors')}", 'WARNING')
+                continue
+            succeeded.add(row['__lineNumber'])
+    if failed:
+        log(f"  {failed} bulk rows failed, {len(succeeded)} succeeded", 'WARNING')
+    return succeeded
+
+def poll_bulk_mutation(expected_count: int) -> Tuple[bool, Set[int]]:
+    """Poll bulk mutation until complete. Returns (success, line numbers of
+    the rows that were applied)."""
     log("Polling for bulk mutation completion...")
 
-    query = """
-    query {
-      currentBulkOperation {
-        id
-        status
-        errorCode
-        objectCount
-        rootObjectCount
-        url
-      }
-    }
-    """
-
     start_time = time.time()
+    delays = poll_delays()
 
     while time.time() - start_time < MAX_POLL_TIME:
-        result = graphql_request(query, use_rate_limit=False)
+        result = graphql_request(CURRENT_BULK_MUTATION_QUERY, use_rate_limit=False)
         operation = result.get('data', {}).get('currentBulkOperation')
 
         if not operation:
-            time.sleep(POLL_INTERVAL)
+            time.sleep(next(delays))
             continue
 
         status = operation.get('status')
@@ -1071,15 +1522,25 @@ def poll_bulk_mutation(expected_count: int) -> Tuple[bool, int]:
 
         if status == 'COMPLETED':
             log(f"✓ Bulk operation completed! Processed {root_count} products")
-            return True, root_count
+            # rootObjectCount includes rows that came back with userErrors;
+            # only the per-row results say what was actually applied
+            url = operation.get('url')
+            if not url:
+                return True, set()
+            try:
+                return True, read_bulk_mutation_results(url)
+            except Exception as e:
+                # The mutation ran — don't fall back and apply it twice
+                log(f"Could not read bulk results ({e}); counting none as applied", 'WARNING')
+                return True, set()
         elif status in ['FAILED', 'CANCELED']:
             log(f"Bulk operation failed: {operation.get('errorCode')}", 'WARNING')
-            return False, 0
+            return False, set()
 
-        time.sleep(POLL_INTERVAL)
+        time.sleep(next(delays))
 
     log("Bulk operation timed out", 'WARNING')
-    return False, 0
+    return False, set()
 
 
 def batch_process(products: List[Dict], operation: str, func) -> int:
@@ -1091,9 +1552,7 @@ def batch_process(products: List[Dict], operation: str, func) -> int:
 
     successful = 0
     failed = 0
-    CHUNK_SIZE = 50  # Report progress every 50 products
-
-    start_time = time.time()
+    progress = ProgressLog(len(products))
 
     with ThreadPoolExecutor(max_workers=MAX_CONCURRENT) as executor:
         futures = {executor.submit(func, p): p for p in products}
@@ -1109,15 +1568,46 @@ def batch_process(products: List[Dict], operation: str, func) -> int:
                 failed += 1
                 log(f"Error: {e}", 'WARNING')
 
-            if i % CHUNK_SIZE == 0 or i == len(products):
-                elapsed = time.time() - start_time
-                rate = i / elapsed if elapsed > 0 else 0
+            if progress.due(i):
+                rate = progress.rate(i)
                 remaining = (len(products) - i) / rate if rate > 0 else 0
                 log(f"  Progress: {i}/{len(products)} ({successful} ok, {failed} failed) - {rate:.1f}/sec, ~{remaining:.0f}s remaining")
 
     log(f"✓ {operation} complete: {successful} successful, {failed} failed")
     return successful
 
+def batch_process_chunks(products: List[Dict], operation: str, func,
+                         chunk_size: int = ALIAS_BATCH_SIZE) -> int:
+    """Like batch_process(), but hands func() a chunk of products at a time
+    (for aliased multi-mutation requests). func returns how many succeeded."""
+    if not products:
+        return 0
+
+    chunks = [products[i:i + chunk_size] for i in range(0, len(products), chunk_size)]
+    log(f"\n{operation} {len(products)} products ({len(chunks)} requests of up to {chunk_size})...")
+
+    successful = 0
+    done = 0
+    progress = ProgressLog(len(products))
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT) as executor:
+        futures = {executor.submit(func, chunk): chunk for chunk in chunks}
+
+        for future in as_completed(futures):
+            chunk = futures[future]
+            done += len(chunk)
+            try:
+                successful += future.result()
+            except Exception as e:
+                log(f"Error: {e}", 'WARNING')
+
+            if progress.due(done):
+                log(f"  Progress: {done}/{len(products)} ({successful} ok, {done - successful} failed)"
+                    f" - {progress.rate(done):.1f}/sec")
+
+    log(f"✓ {operation} complete: {successful} successful, {len(products) - successful} failed")
+    return successful
+
 # =============================================================================
 # ARCHIVE MISSING PRODUCTS (+ 301 redirects for the dead URLs)
 # =============================================================================
@@ -1207,27 +1697,29 @@ def check_redirect_scope() -> bool:
         return False
     return True
 
-def archive_product(sku: str, existing: Dict, known_handles: Set[str]) -> bool:
-    """Archive a product (set to DRAFT) and 301-redirect its URL to the
-    matching collection so Google doesn't accumulate 404s."""
-    if existing.get('status') == 'DRAFT':
-        return True  # Already archived
+def archive_products(batch: List[Dict]) -> List[Dict]:
+    """Archive products (set to DRAFT) with one aliased productUpdate request.
+    Returns the ones Shopify actually archived."""
+    payloads = graphql_aliased_batch(
+        'productUpdate', {'product': 'ProductUpdateInput!'},
+        [{'product': {'id': e['product_id'], 'status': 'DRAFT'}} for e in batch],
+        'product { id } userErrors { field message }',
+    )
 
-    if DRY_RUN:
-        return True
+    archived = []
+    for existing, payload in zip(batch, payloads):
+        if payload.get('product'):
+            archived.append(existing)
+        else:
+            log(f"Archive {existing['product_id']} failed: {payload.get('userErrors')}", 'WARNING')
+    return archived
 
-    result = graphql_request(PRODUCT_UPDATE_MUTATION, {
-        'product': {
-            'id': existing['product_id'],
-            'status': 'DRAFT'
-        }
-    })
 
-    ok = bool(result.get('data', {}).get('productUpdate', {}).get('product'))
-    if ok and existing.get('handle'):
-        target = redirect_target_for(existing, known_handles)
-        create_url_redirect(f"/products/{existing['handle']}", target)
-    return ok
+def redirect_archived(existing: Dict, known_handles: Set[str]) -> bool:
+    """301-redirect an archived product's URL to the matching collection so
+    Google doesn't accumulate 404s."""
+    target = redirect_target_for(existing, known_handles)
+    return create_url_redirect(f"/products/{existing['handle']}", target)
 
 
 def archive_missing_products(missing_skus: List[str], existing_products: Dict[str, Dict],
@@ -1238,11 +1730,22 @@ def archive_missing_products(missing_skus: List[str], existing_products: Dict[st
 
     log(f"\nArchiving {len(missing_skus)} missing products (with 301 redirects)...")
 
-    archived = 0
-    for sku in missing_skus:
-        existing = existing_products.get(sku)
-        if existing and archive_product(sku, existing, known_handles):
-            archived += 1
+    missing = [existing_products[sku] for sku in missing_skus if sku in existing_products]
+    pending = [e for e in missing if e.get('status') != 'DRAFT']
+    archived = len(missing) - len(pending)  # already DRAFT
+
+    if DRY_RUN:
+        archived += len(pending)
+    else:
+        newly_archived = []
+        for start in range(0, len(pending), ALIAS_BATCH_SIZE):
+            newly_archived += archive_products(pending[start:start + ALIAS_BATCH_SIZE])
+        archived += len(newly_archived)
+
+        # Redirects are independent single mutations — run them through the
+        # worker pool (the shared rate limiter still paces them)
+        batch_process([e for e in newly_archived if e.get('handle')], "Redirecting",
+                      lambda e: redirect_archived(e, known_handles))
 
     log(f"✓ Archived {archived} products")
     return archived
@@ -1267,11 +1770,32 @@ def main():
         log("Error: SHOPIFY_ACCESS_TOKEN not set", 'ERROR')
         return
 
+    if SKIP_IF_CSV_UNCHANGED and not DRY_RUN and csv_unchanged_since_clean_run():
+        log("CSV unchanged since the last clean sync — nothing to do")
+        return
+
     # Verify the token can write redirects; warn loudly if not (archive 301s
     # fail silently without write_online_store_navigation).
     if not DRY_RUN:
         check_redirect_scope()
 
+    # The Shopify catalog read (bulk query + polling) doesn't depend on the
+    # CSV, so start it now and let it run while we download and categorize.
+    # A daemon thread, not an executor: if a step below raises, the process
+    # exits right away instead of joining a fetch that can poll for up to
+    # MAX_POLL_TIME.
+    fetch_result: Dict[str, object] = {}
+
+    def fetch_catalog():
+        try:
+            fetch_result['products'] = fetch_existing_products()
+        except BaseException as e:
+            fetch_result['error'] = e
+
+    fetch_start = time.time()
+    fetch_thread = threading.Thread(target=fetch_catalog, name='catalog-fetch', daemon=True)
+    fetch_thread.start()
+
     # Step 1: Initialize categorizer
     log("\n[1/8] Initializing categorization system...")
     categorizer = ProductCategorizer('category_map_v4.json')
@@ -1295,14 +1819,13 @@ def main():
 
     # Step 4: Fetch existing products (using bulk query - fast!)
     log("\n[4/8] Fetching existing Shopify products...")
-    fetch_start = time.time()
-    try:
-        existing_products = get_existing_products_bulk()
-    except Exception as e:
-        log(f"Bulk query failed ({e}), using paginated fallback...", 'WARNING')
-        existing_products = get_existing_products_paginated()
+    wait_start = time.time()
+    fetch_thread.join()
+    if 'error' in fetch_result:
+        raise fetch_result['error']
+    existing_products = fetch_result['products']
     fetch_time = time.time() - fetch_start
-    log(f"  Fetch completed in {fetch_time:.1f}s")
+    log(f"  Fetch completed in {fetch_time:.1f}s (waited {time.time() - wait_start:.1f}s after categorizing)")
 
     # Step 5: Calculate delta
     log("\n[5/8] Calculating delta...")
@@ -1318,6 +1841,11 @@ def main():
     log("\n[7/8] Syncing to Shopify...")
     sync_start = time.time()
 
+    # Resolve the location once up front so the concurrent create workers
+    # and the inventory pass all hit the cache instead of racing to fetch it
+    if to_create or to_update:
+        get_default_location_id()
+
     created = 0
     updated = 0
     inventoried = 0
@@ -1331,33 +1859,48 @@ def main():
     else:
         # Try bulk operations first, fall back to individual if they fail
 
-        if to_create:
+        if len(to_create) >= BULK_MIN_PRODUCTS:
             success, count = try_bulk_create(to_create)
             if success:
                 created = count
             else:
                 log("Falling back to individual creates...")
                 created = batch_process(to_create, "Creating", create_product)
+        elif to_create:
+            created = batch_process(to_create, "Creating", create_product)
 
-        if to_update:
+        # Only products with product-level changes go through bulk
+        # productUpdate; price/inventory-only ones don't justify a bulk run
+        if sum(1 for p in to_update if has_product_field_changes(p)) >= BULK_MIN_PRODUCTS:
             success, count = try_bulk_update(to_update)
             if success:
-                updated = count
-                price_ok, _ = try_bulk_price_update(to_update)
+                price_ok, priced = try_bulk_price_update(to_update)
                 if not price_ok:
-                    log("Bulk price update failed — applying prices individually...")
-                    priced = [p for p in to_update if p.get('_flags', {}).get('price')]
-                    def apply_price(p):
-                        result = graphql_request(VARIANT_PRICE_MUTATION, {
-                            "productId": p['_existing']['product_id'],
-                            "variants": [{"id": p['_existing']['variant_id'],
-                                          "price": p['_desired']['price']}]
-                        })
-                        return not result.get('data', {}).get('productVariantsBulkUpdate', {}).get('userErrors', [])
-                    batch_process(priced, "Pricing", apply_price)
+                    log("Bulk price update failed — applying prices in aliased batches...")
+                    pending = [p for p in to_update if p.get('_flags', {}).get('price')]
+                    priced = []
+
+                    def apply_price_chunk(chunk: List[Dict]) -> int:
+                        applied = apply_prices(chunk)
+                        priced.extend(applied)
+                        return len(applied)
+
+                    batch_process_chunks(pending, "Pricing", apply_price_chunk)
+
+                # Price/inventory-only products skip productUpdate: a price-only
+                # one is updated once its price is applied; inventory-only ones
+                # are checked against the inventory pass below
+                priced_ids = {id(p) for p in priced}
+                updated = count + sum(
+                    1 for p in to_update
+                    if not has_product_field_changes(p)
+                    and (not p.get('_flags', {}).get('price') or id(p) in priced_ids)
+                )
             else:
                 log("Falling back to individual updates...")
-                updated = batch_process(to_update, "Updating", update_product)
+                updated = batch_process_chunks(to_update, "Updating", update_products)
+        elif to_update:
+            updated = batch_process_chunks(to_update, "Updating", update_products)
 
         # Inventory quantities (creates already get theirs via productSet)
         inventoried = sync_inventory_quantities(to_update)
@@ -1368,6 +1911,17 @@ def main():
     log("\n[8/8] Archiving missing products...")
     archived = archive_missing_products(missing_skus, existing_products, known_handles)
 
+    if not DRY_RUN:
+        inventory_expected = sum(
+            1 for p in to_update
+            if p.get('_flags', {}).get('inventory') and p.get('_existing', {}).get('inventory_item_id')
+        )
+        save_sync_state(
+            created == len(to_create) and updated == len(to_update)
+            and inventoried == inventory_expected
+            and (not ARCHIVE_MISSING or archived == len(missing_skus))
+        )
+
     # Summary
     total_time = time.time() - start_time
 
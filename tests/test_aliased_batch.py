@@ -0,0 +1,74 @@
+"""Partial failures in aliased GraphQL batches (graphql_aliased_batch and
+the update_products / apply_prices fallback built on it)."""
+
+import unittest
+from unittest import mock
+
+import sync_shopify_bulk_v3 as sync
+
+
+def make_product(i, price_changed=False):
+    return {
+        '_desired': {
+            'sku': f'SKU{i}', 'title': f'Product {i}', 'product_type': 'Bags',
+            'vendor': 'JohnnyVac', 'status': 'ACTIVE', 'managed_tags': ['bags'],
+            'category_gid': '', 'price': '10.00',
+        },
+        '_existing': {'product_id': f'gid://shopify/Product/{i}', 'variant_id': f'gid://shopify/ProductVariant/{i}'},
+        '_flags': {'core': True, 'price': price_changed},
+    }
+
+
+def fake_graphql(bad_ids, reject_whole_batch):
+    """graphql_request stand-in: products in bad_ids fail, either with
+    userErrors on their alias or (reject_whole_batch) as a top-level
+    coercion error that rejects the entire request."""
+    calls = []
+
+    def request(query, variables=None, use_rate_limit=True, cost=sync.DEFAULT_QUERY_COST):
+        inputs = {name: value for name, value in (variables or {}).items()}
+        calls.append(len(inputs))
+        ids = {int(name[len('product'):]): value['id'] for name, value in inputs.items()}
+        if reject_whole_batch and any(pid in bad_ids for pid in ids.values()):
+            return {'errors': [{'message': 'Variable $product3 of type ProductUpdateInput! was provided invalid value'}]}
+        data = {}
+        for i, pid in ids.items():
+            if pid in bad_ids:
+                data[f'm{i}'] = {'product': None, 'userErrors': [{'field': ['id'], 'message': 'Product does not exist'}]}
+            else:
+                data[f'm{i}'] = {'product': {'id': pid}, 'userErrors': []}
+        return {'data': data}
+
+    return request, calls
+
+
+class AliasedBatchPartialFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.batch = [make_product(i) for i in range(25)]
+        self.bad = {'gid://shopify/Product/3'}
+
+    def test_alias_user_error_only_fails_that_product(self):
+        request, calls = fake_graphql(self.bad, reject_whole_batch=False)
+        with mock.patch.object(sync, 'graphql_request', request), mock.patch.object(sync, 'DRY_RUN', False):
+            self.assertEqual(sync.update_products(self.batch), 24)
+        self.assertEqual(calls, [25])
+
+    def test_rejected_batch_is_resent_one_at_a_time(self):
+        request, calls = fake_graphql(self.bad, reject_whole_batch=True)
+        with mock.patch.object(sync, 'graphql_request', request), mock.patch.object(sync, 'DRY_RUN', False):
+            self.assertEqual(sync.update_products(self.batch), 24)
+        self.assertEqual(calls, [25] + [1] * 25)
+
+    def test_payloads_keep_input_order(self):
+        request, _ = fake_graphql(self.bad, reject_whole_batch=True)
+        with mock.patch.object(sync, 'graphql_request', request):
+            payloads = sync.graphql_aliased_batch(
+                'productUpdate', {'product': 'ProductUpdateInput!'},
+                [{'product': {'id': f'gid://shopify/Product/{i}'}} for i in range(5)],
+                'product { id } userErrors { field message }',
+            )
+        self.assertEqual([bool(p.get('product')) for p in payloads], [True, True, True, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""retry_delay backoff / Retry-After handling and SlidingWindowLimiter."""
+
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import rate_limit
+from rate_limit import SlidingWindowLimiter, retry_delay
+
+
+class RetryDelayTest(unittest.TestCase):
+    def test_backoff_stays_in_upper_half_of_window(self):
+        for attempt in range(8):
+            delay = min(rate_limit.RETRY_MAX_DELAY, rate_limit.RETRY_BASE_DELAY * 2 ** attempt)
+            for _ in range(50):
+                self.assertTrue(delay / 2 <= retry_delay(attempt) <= delay)
+
+    def test_backoff_is_capped(self):
+        self.assertLessEqual(retry_delay(30), rate_limit.RETRY_MAX_DELAY)
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(retry_delay(0, '7'), 7.0)
+        self.assertEqual(retry_delay(0, '0'), 0.0)
+        self.assertEqual(retry_delay(0, '-3'), 0.0)
+        self.assertEqual(retry_delay(0, '3600'), rate_limit.RETRY_AFTER_CAP)
+
+    def test_retry_after_http_date(self):
+        when = datetime.now(timezone.utc) + timedelta(seconds=20)
+        self.assertTrue(15 <= retry_delay(0, format_datetime(when, usegmt=True)) <= 20)
+        past = datetime.now(timezone.utc) - timedelta(hours=1)
+        self.assertEqual(retry_delay(0, format_datetime(past, usegmt=True)), 0.0)
+
+    def test_unusable_retry_after_falls_back_to_backoff(self):
+        for value in ('nan', 'inf', '-inf', 'soon', ''):
+            with self.subTest(value=value):
+                delay = retry_delay(1, value)
+                self.assertTrue(rate_limit.RETRY_BASE_DELAY <= delay <= 2 * rate_limit.RETRY_BASE_DELAY)
+
+
+class SlidingWindowLimiterTest(unittest.TestCase):
+    def test_calls_within_limit_do_not_wait(self):
+        limiter = SlidingWindowLimiter(5, period=0.5)
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_call_over_limit_waits_for_window(self):
+        limiter = SlidingWindowLimiter(3, period=0.3)
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.29)
+
+    def test_window_slides(self):
+        limiter = SlidingWindowLimiter(2, period=0.2)
+        limiter.acquire()
+        limiter.acquire()
+        time.sleep(0.25)
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
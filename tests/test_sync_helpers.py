@@ -0,0 +1,120 @@
+"""merge_tags and the csv_lines download / cache paths."""
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import sync_shopify_bulk_v3 as sync
+
+
+class MergeTagsTest(unittest.TestCase):
+    def test_manual_tags_are_preserved(self):
+        merged = sync.merge_tags(['Clearance', 'source:old', 'bags'], ['bags', 'source:jv'], {'bags', 'filters'})
+        self.assertEqual(merged, ['Clearance', 'bags', 'source:jv'])
+
+    def test_recased_stale_handle_is_replaced(self):
+        merged = sync.merge_tags(['Filters', ' Confidence:High '], ['bags'], {'bags', 'filters'})
+        self.assertEqual(merged, ['bags'])
+
+    def test_result_is_deduplicated_case_insensitively(self):
+        merged = sync.merge_tags(['Sale', 'sale ', ''], ['SALE'], set())
+        self.assertEqual(merged, ['Sale'])
+        self.assertEqual(sync.tag_set(merged), sync.tag_set(['sale']))
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b'', headers=None, encoding=None, chunk_size=None):
+        self.status_code = status_code
+        self.chunk_size = chunk_size
+        self.headers = headers or {}
+        self.encoding = encoding
+        self._body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def iter_content(self, chunk_size=1):
+        chunk_size = self.chunk_size or chunk_size
+        for i in range(0, len(self._body), chunk_size):
+            yield self._body[i:i + chunk_size]
+
+
+# cp1252 like the supplier's export, long enough for the charset guess
+CSV_BODY = (
+    'Sku,Description\r\n'
+    'JV1,"Sac à poussière\r\nparagraph two"\r\n'
+    + ''.join(f'JV{i},Filtre à cartouche pour aspirateur central, qualité supérieure\r\n' for i in range(2, 42))
+).encode('cp1252')
+
+
+class CsvLinesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        for name, value in {
+            'CSV_CACHE_DIR': self.tmp,
+            'CSV_CACHE_FILE': os.path.join(self.tmp, 'JVWebProducts.csv'),
+            'CSV_CACHE_META': os.path.join(self.tmp, 'JVWebProducts.meta.json'),
+        }.items():
+            patcher = mock.patch.object(sync, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        validators = mock.patch.object(sync, '_csv_validators', {})
+        validators.start()
+        self.addCleanup(validators.stop)
+
+    def read_rows(self, response):
+        with mock.patch.object(sync.SESSION, 'get', return_value=response) as get:
+            with sync.csv_lines() as lines:
+                rows = list(csv.DictReader(lines))
+        return rows, get.call_args.kwargs['headers']
+
+    def test_download_writes_raw_bytes_and_meta(self):
+        response = FakeResponse(200, CSV_BODY, {'ETag': '"v1"', 'Last-Modified': 'Tue, 01 Sep 2026 00:00:00 GMT'})
+        with mock.patch.object(sync, 'log'):
+            rows, headers = self.read_rows(response)
+
+        self.assertEqual(headers, {})
+        self.assertEqual([r['Sku'] for r in rows], [f'JV{i}' for i in range(1, 42)])
+        self.assertEqual(rows[0]['Description'], 'Sac à poussière\r\nparagraph two')
+        with open(sync.CSV_CACHE_FILE, 'rb') as f:
+            self.assertEqual(f.read(), CSV_BODY)
+        with open(sync.CSV_CACHE_META, encoding='utf-8') as f:
+            meta = json.load(f)
+        self.assertEqual(meta['etag'], '"v1"')
+        # Not UTF-8 and no charset: the guessed encoding is recorded for the 304 path
+        self.assertEqual(CSV_BODY.decode(meta['encoding']), CSV_BODY.decode('cp1252'))
+        self.assertEqual(sync._csv_validators['etag'], '"v1"')
+
+    def test_not_modified_reads_cache_like_download(self):
+        with mock.patch.object(sync, 'log'):
+            downloaded, _ = self.read_rows(FakeResponse(200, CSV_BODY, {'ETag': '"v1"'}))
+            sync._csv_validators.clear()
+            cached, headers = self.read_rows(FakeResponse(304))
+
+        self.assertEqual(headers, {'If-None-Match': '"v1"'})
+        self.assertEqual(cached, downloaded)
+        self.assertEqual(sync._csv_validators['etag'], '"v1"')
+
+    def test_charset_from_server_is_used(self):
+        body = CSV_BODY.decode('cp1252').encode('utf-8')
+        # Small chunks so rows and multibyte characters straddle chunk boundaries
+        rows, _ = self.read_rows(FakeResponse(200, body, encoding='utf-8', chunk_size=7))
+        self.assertEqual(rows[0]['Description'], 'Sac à poussière\r\nparagraph two')
+        with open(sync.CSV_CACHE_META, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['encoding'], 'utf-8')
+
+
+if __name__ == '__main__':
+    unittest.main()